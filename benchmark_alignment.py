@@ -0,0 +1,139 @@
+import argparse
+import os
+import time
+
+import cv2
+import numpy as np
+
+from src.modules.sensitive_data_masker.align import (
+    align_boxes,
+    compute_alignment_features,
+    estimate_alignment,
+)
+from src.modules.sensitive_data_masker.coordinates import scale_coordinates
+from src.modules.sensitive_data_masker.registry import (
+    COORDINATES_DIR,
+    load_bank_templates,
+)
+
+
+def pad_top(image, pixels):
+    """
+    Taller status bar: rows of the first line color added on top
+    """
+    top = np.repeat(image[:1], pixels, axis=0)
+    return np.vstack([top, image]), np.array([0, pixels, 0, 0])
+
+
+def crop_top(image, pixels):
+    return image[pixels:], np.array([0, -pixels, 0, 0])
+
+
+def build_variants(image, boxes):
+    """
+    Synthetic inputs of a reference image with the boxes where its masks
+    really are
+
+    Returns:
+        list: (name, image, boxes) tuples
+    """
+    height, width = image.shape[:2]
+    variants = [("original", image, boxes)]
+
+    padded, offset = pad_top(image, int(height * 0.05))
+    variants.append(("status bar +5%", padded, boxes + offset))
+
+    cropped, offset = crop_top(image, int(height * 0.04))
+    variants.append(("crop top 4%", cropped, boxes + offset))
+
+    resized = cv2.resize(image, (int(width * 0.8), int(height * 0.8)))
+    variants.append(
+        (
+            "resized 80%",
+            resized,
+            scale_coordinates(boxes, width, height, resized.shape[1], resized.shape[0]),
+        )
+    )
+    return variants
+
+
+def box_error(boxes, expected):
+    """
+    Mean distance in pixels between the corners of boxes and the expected ones
+    """
+    corners = np.hstack([boxes[:, :2], boxes[:, :2] + boxes[:, 2:]])
+    expected_corners = np.hstack([expected[:, :2], expected[:, :2] + expected[:, 2:]])
+    return float(np.abs(corners - expected_corners).mean())
+
+
+def run_benchmark(coordinates_dir=COORDINATES_DIR):
+    results = {}
+    for bank_name in sorted(os.listdir(coordinates_dir)):
+        if not os.path.isdir(os.path.join(coordinates_dir, bank_name)):
+            continue
+
+        for template in load_bank_templates(bank_name, ".png", coordinates_dir):
+            boxes = template["page_boxes"].get(0)
+            if boxes is None or not len(boxes):
+                continue
+
+            reference_features = template["alignment_features"]
+            reference_width = template["reference_width"]
+            reference_height = template["reference_height"]
+
+            for name, image, expected in build_variants(
+                template["reference_image"], boxes
+            ):
+                start_time = time.perf_counter()
+                matrix = estimate_alignment(
+                    reference_features, compute_alignment_features(image)
+                )
+                elapsed_ms = (time.perf_counter() - start_time) * 1000
+
+                scaled = scale_coordinates(
+                    boxes,
+                    reference_width,
+                    reference_height,
+                    image.shape[1],
+                    image.shape[0],
+                )
+                aligned = align_boxes(boxes, matrix) if matrix is not None else scaled
+
+                entry = results.setdefault(
+                    name, {"ms": [], "scaled": [], "aligned": [], "fallbacks": 0}
+                )
+                entry["ms"].append(elapsed_ms)
+                entry["scaled"].append(box_error(scaled, expected))
+                entry["aligned"].append(box_error(aligned, expected))
+                entry["fallbacks"] += matrix is None
+
+    print_report(results)
+    return results
+
+
+def print_report(results):
+    print(f"\n{'=' * 78}")
+    print("📊 ALIGNMENT BENCHMARK")
+    print(f"{'=' * 78}")
+    print(
+        f"{'input':<16} {'images':>6} {'ms/image':>9} {'p95 ms':>8} {'scale err px':>13} {'aligned err px':>15} {'fallbacks':>9}"
+    )
+    for name, entry in results.items():
+        print(
+            f"{name:<16} {len(entry['ms']):>6} {np.mean(entry['ms']):>9.1f} {np.percentile(entry['ms'], 95):>8.1f} {np.mean(entry['scaled']):>13.1f} {np.mean(entry['aligned']):>15.1f} {entry['fallbacks']:>9}"
+        )
+    print(f"{'=' * 78}\n")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Benchmark of the ORB alignment of masks on shifted, cropped and resized copies of the template references"
+    )
+    parser.add_argument(
+        "-d",
+        "--dir",
+        default=COORDINATES_DIR,
+        help="coordinates directory with the templates",
+    )
+    args = parser.parse_args()
+    run_benchmark(args.dir)
@@ -0,0 +1,150 @@
+import argparse
+import asyncio
+import os
+import time
+
+import numpy as np
+
+from src.modules.classify.prompt import get_prompt_find_out_bank_of_payment_receipts
+from src.modules.sensitive_data_masker.registry import COORDINATES_DIR
+from src.utils.payload import MIME_TYPES, ORIGINAL_FORMAT, PayloadOptimizer
+
+
+def find_references(coordinates_dir):
+    references = []
+    for root, _, files in os.walk(coordinates_dir):
+        for file in sorted(files):
+            if os.path.splitext(file)[1].lower() in (".png", ".jpg", ".jpeg", ".pdf"):
+                references.append(os.path.join(root, file))
+    return sorted(references)
+
+
+async def measure_gemini(parts, prompt):
+    """
+    Returns:
+        tuple: (latency in ms, prompt tokens billed)
+    """
+    from src.utils.gemini_client import gemini_client
+
+    start_time = time.perf_counter()
+    response = await gemini_client.generate_content(
+        [prompt, *parts], response_mime_type="text/plain"
+    )
+    elapsed_ms = (time.perf_counter() - start_time) * 1000
+    usage = getattr(response, "usage_metadata", None)
+    return elapsed_ms, getattr(usage, "prompt_token_count", 0) if usage else 0
+
+
+async def run_benchmark(coordinates_dir, optimizer, with_gemini):
+    original = PayloadOptimizer(image_format=ORIGINAL_FORMAT)
+    prompt = get_prompt_find_out_bank_of_payment_receipts()
+    results = {}
+
+    for path in find_references(coordinates_dir):
+        ext = os.path.splitext(path)[1].lower()
+
+        start_time = time.perf_counter()
+        payload = optimizer.get_payload(path)
+        convert_ms = (time.perf_counter() - start_time) * 1000
+
+        entry = results.setdefault(
+            "pdf" if ext == ".pdf" else "image",
+            {
+                "original": [],
+                "payload": [],
+                "convert_ms": [],
+                "before_ms": [],
+                "after_ms": [],
+                "before_tokens": [],
+                "after_tokens": [],
+            },
+        )
+        entry["original"].append(payload["original_bytes"])
+        entry["payload"].append(payload["payload_bytes"])
+        entry["convert_ms"].append(convert_ms)
+
+        if with_gemini:
+            try:
+                before = await measure_gemini(
+                    original.get_payload(path, mime_type=MIME_TYPES.get(ext))["parts"],
+                    prompt,
+                )
+                after = await measure_gemini(payload["parts"], prompt)
+            except Exception as e:
+                print(f"benchmark_payload: ❌ {path}: {e}")
+                continue
+            entry["before_ms"].append(before[0])
+            entry["before_tokens"].append(before[1])
+            entry["after_ms"].append(after[0])
+            entry["after_tokens"].append(after[1])
+
+    print_report(results, optimizer, with_gemini)
+    return results
+
+
+def print_report(results, optimizer, with_gemini):
+    print(f"\n{'=' * 78}")
+    print(f"📊 PAYLOAD BENCHMARK ({optimizer.signature})")
+    print(f"{'=' * 78}")
+    print(
+        f"{'input':<8} {'files':>5} {'original KB':>12} {'payload KB':>11} {'reduction':>10} {'convert ms':>11}"
+    )
+    for name, entry in results.items():
+        original_kb = sum(entry["original"]) / 1024
+        payload_kb = sum(entry["payload"]) / 1024
+        print(
+            f"{name:<8} {len(entry['original']):>5} {original_kb:>12.1f} {payload_kb:>11.1f} {1 - payload_kb / original_kb:>10.1%} {np.mean(entry['convert_ms']):>11.1f}"
+        )
+
+    if with_gemini:
+        print(
+            f"\n{'input':<8} {'before ms':>10} {'after ms':>9} {'before tokens':>14} {'after tokens':>13}"
+        )
+        for name, entry in results.items():
+            if not entry["before_ms"]:
+                continue
+            print(
+                f"{name:<8} {np.mean(entry['before_ms']):>10.0f} {np.mean(entry['after_ms']):>9.0f} {np.mean(entry['before_tokens']):>14.0f} {np.mean(entry['after_tokens']):>13.0f}"
+            )
+    print(f"{'=' * 78}\n")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Benchmark of the bytes uploaded to Gemini before and after the payload optimization, on the template references"
+    )
+    parser.add_argument(
+        "-d",
+        "--dir",
+        default=COORDINATES_DIR,
+        help="coordinates directory with the templates",
+    )
+    parser.add_argument(
+        "--format", default="webp", choices=["webp", "jpeg"], help="payload format"
+    )
+    parser.add_argument(
+        "--max-side", type=int, default=2048, help="maximum long side in pixels"
+    )
+    parser.add_argument("--quality", type=int, default=85, help="encoding quality")
+    parser.add_argument(
+        "--pdf-dpi", type=int, default=150, help="rasterization DPI of PDF pages"
+    )
+    parser.add_argument(
+        "--with-gemini",
+        action="store_true",
+        help="also send every reference before and after to Gemini to measure latency and prompt tokens (paid API calls)",
+    )
+    args = parser.parse_args()
+
+    asyncio.run(
+        run_benchmark(
+            args.dir,
+            PayloadOptimizer(
+                image_format=args.format,
+                max_side=args.max_side,
+                quality=args.quality,
+                pdf_dpi=args.pdf_dpi,
+            ),
+            args.with_gemini,
+        )
+    )
@@ -0,0 +1,40 @@
+import argparse
+import datetime
+
+from src.modules.sensitive_data_masker.feature_index import FEATURE_INDEX_FILENAME
+from src.modules.sensitive_data_masker.registry import (
+    COORDINATES_DIR,
+    build_feature_index,
+)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Build the matching feature index of the coordinate templates"
+    )
+    parser.add_argument(
+        "-d",
+        "--dir",
+        default=COORDINATES_DIR,
+        help=f"coordinates directory with the templates (default: {COORDINATES_DIR})",
+    )
+    parser.add_argument(
+        "-b",
+        "--bank",
+        action="append",
+        help="only (re)index the templates of this bank, can be repeated",
+    )
+    args = parser.parse_args()
+
+    total = build_feature_index(args.dir, args.bank)
+    print(
+        f"build_feature_index: {total} template(s) indexed in {args.dir}/{FEATURE_INDEX_FILENAME} ✅"
+    )
+
+
+if __name__ == "__main__":
+    start_time = datetime.datetime.now()
+    main()
+    print(
+        f"build_feature_index: execution finished. Total time: {datetime.datetime.now() - start_time}"
+    )
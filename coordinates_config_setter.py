@@ -5,17 +5,29 @@ import fitz
 import numpy as np
 from pathlib import Path
 
+from src.modules.sensitive_data_masker.coordinates import (
+    normalize_page_coordinates,
+    serialize_page_coordinates,
+)
+from src.modules.sensitive_data_masker.registry import (
+    COORDINATES_DIR,
+    build_feature_index,
+    get_page_render_size,
+)
+
 
 class CoordinateSelector:
-    def __init__(self, file_path, output_file="coordinates_output.json"):
+    def __init__(self, file_path, output_file="coordinates_output.json", page_index=0):
         self.file_path = file_path
         self.output_file = output_file
+        self.pages = {}
         self.file_extension = Path(file_path).suffix.lower()
         self.is_pdf = self.file_extension == ".pdf"
+        self.page_index = page_index if self.is_pdf else 0
 
         if self.is_pdf:
             self.pdf_doc = fitz.open(file_path)
-            self.pdf_page = self.pdf_doc[0]
+            self.pdf_page = self.pdf_doc[page_index]
             pix = self.pdf_page.get_pixmap(matrix=fitz.Matrix(2, 2))
             img_data = np.frombuffer(pix.samples, dtype=np.uint8).reshape(
                 pix.height, pix.width, pix.n
@@ -35,7 +47,7 @@ class CoordinateSelector:
         self.drawing = False
         self.start_point = None
 
-        file_type = "PDF" if self.is_pdf else "Image"
+        file_type = f"PDF page {page_index + 1}" if self.is_pdf else "Image"
         self.window_name = f"Coordinate Selector ({file_type}) - Draw rectangles, Press 'u' to undo, 'r' to reset, 'q' to quit"
 
         self.load_coordinates()
@@ -114,18 +126,29 @@ class CoordinateSelector:
         if Path(self.output_file).exists():
             try:
                 with open(self.output_file, "r", encoding="utf-8") as f:
-                    self.rectangles = json.load(f)
+                    self.pages = normalize_page_coordinates(json.load(f))
+                self.rectangles = self.pages.get(self.page_index, [])
                 self.redraw()
             except Exception as e:
                 print(f"❌ Error loading coordinates: {e}")
 
     def save_coordinates(self):
-        if not self.rectangles:
+        if self.rectangles:
+            self.pages[self.page_index] = self.rectangles
+        else:
+            self.pages.pop(self.page_index, None)
+
+        if not self.pages:
             return False
 
         try:
             with open(self.output_file, "w", encoding="utf-8") as f:
-                json.dump(self.rectangles, f, indent=2, ensure_ascii=False)
+                json.dump(
+                    serialize_page_coordinates(self.pages),
+                    f,
+                    indent=2,
+                    ensure_ascii=False,
+                )
             return True
         except Exception as e:
             print(f"❌ Error saving: {e}")
@@ -143,36 +166,37 @@ class CoordinateSelector:
             self.redraw()
 
     def generate_masked_output(self):
-        if not self.rectangles:
+        if not self.pages:
             return False
 
         try:
             if self.is_pdf:
-                output_path = "coordinates_output.pdf"
+                output_path = self.masked_output_path()
                 output_doc = fitz.open(self.file_path)
-                output_page = output_doc[0]
 
-                page_rect = output_page.rect
-                img_height, img_width = self.image.shape[:2]
-                scale_x = page_rect.width / img_width
-                scale_y = page_rect.height / img_height
+                for page_index, rectangles in self.pages.items():
+                    output_page = output_doc[page_index]
+                    page_rect = output_page.rect
+                    img_width, img_height = get_page_render_size(output_page)
+                    scale_x = page_rect.width / img_width
+                    scale_y = page_rect.height / img_height
 
-                for coord in self.rectangles:
-                    pdf_x = coord["x"] * scale_x
-                    pdf_y = coord["y"] * scale_y
-                    pdf_width = coord["width"] * scale_x
-                    pdf_height = coord["height"] * scale_y
+                    for coord in rectangles:
+                        pdf_x = coord["x"] * scale_x
+                        pdf_y = coord["y"] * scale_y
+                        pdf_width = coord["width"] * scale_x
+                        pdf_height = coord["height"] * scale_y
 
-                    rect = fitz.Rect(
-                        pdf_x, pdf_y, pdf_x + pdf_width, pdf_y + pdf_height
-                    )
-                    output_page.draw_rect(rect, color=(0, 0, 0), fill=(0, 0, 0))
+                        rect = fitz.Rect(
+                            pdf_x, pdf_y, pdf_x + pdf_width, pdf_y + pdf_height
+                        )
+                        output_page.draw_rect(rect, color=(0, 0, 0), fill=(0, 0, 0))
 
                 output_doc.save(output_path)
                 output_doc.close()
                 print(f"✅ {output_path}")
             else:
-                output_path = "coordinates_output.png"
+                output_path = self.masked_output_path()
                 masked_image = self.original_image.copy()
 
                 for coord in self.rectangles:
@@ -192,6 +216,30 @@ class CoordinateSelector:
             print(f"❌ Error: {e}")
             return False
 
+    def masked_output_path(self):
+        """
+        Masked reference saved next to the JSON with the same name, so a
+        template saved into a bank folder is complete right away
+        """
+        return str(
+            Path(self.output_file).with_suffix(".pdf" if self.is_pdf else ".png")
+        )
+
+    def update_feature_index(self):
+        """
+        Refresh the feature index of the bank when the template was saved
+        straight into src/config/coordinates/BANK/
+        """
+        output_dir = Path(self.output_file).resolve().parent
+        if output_dir.parent != Path(COORDINATES_DIR).resolve():
+            return
+
+        try:
+            build_feature_index(COORDINATES_DIR, [output_dir.name])
+            print(f"✅ feature index updated for [{output_dir.name}]")
+        except Exception as e:
+            print(f"❌ Error updating feature index: {e}")
+
     def run(self):
         cv2.namedWindow(self.window_name, cv2.WINDOW_NORMAL)
         cv2.setMouseCallback(self.window_name, self.mouse_callback)
@@ -201,7 +249,8 @@ class CoordinateSelector:
             key = cv2.waitKey(1) & 0xFF
 
             if key == ord("q"):
-                self.generate_masked_output()
+                if self.generate_masked_output():
+                    self.update_feature_index()
                 print(f"✅ {self.output_file}")
                 break
             elif key == ord("r"):
@@ -228,11 +277,18 @@ def main():
         default="coordinates_output.json",
         help="Output JSON file path (default: coordinates_output.json)",
     )
+    parser.add_argument(
+        "-p",
+        "--page",
+        type=int,
+        default=1,
+        help="PDF page to draw the rectangles on, starting at 1 (default: 1)",
+    )
 
     args = parser.parse_args()
 
     try:
-        selector = CoordinateSelector(args.input, args.output)
+        selector = CoordinateSelector(args.input, args.output, args.page - 1)
         selector.run()
     except Exception as e:
         print(f"❌ Error: {e}")
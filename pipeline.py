@@ -1,10 +1,9 @@
+import asyncio
 import datetime
-import subprocess
 import argparse
-import os
-import shutil
 
-from src.utils.dirs import remove_empty_dirs
+from src.modules.classify.args import positive_int
+from src.modules.pipeline.execute import organize_and_classify
 
 
 def main():
@@ -23,36 +22,16 @@ def main():
         required=True,
         help="Output directory for organized and classified files",
     )
-
-    args = parser.parse_args()
-
-    temp_organized = "z_temp_organized"
-
-    print(
-        f"pipeline: executing file_organizer.py to organize files {args.input} into {temp_organized}"
-    )
-    subprocess.run(
-        f"python file_organizer.py -i '{args.input}' -o '{temp_organized}'",
-        shell=True,
-        check=True,
+    parser.add_argument(
+        "--batch-size",
+        type=positive_int,
+        default=1,
+        help="receipts sent to Gemini in a single classification request",
     )
 
-    for person_folder in os.listdir(temp_organized):
-        person_path = os.path.join(temp_organized, person_folder)
-        if os.path.isdir(person_path):
-            output_person_path = os.path.join(args.output, person_folder)
-            print(
-                f"pipeline: executing receipt_organizer.py to organize files {person_path} into {output_person_path}"
-            )
-            subprocess.run(
-                f"python receipt_organizer.py -i '{person_path}' -o '{output_person_path}'",
-                shell=True,
-                check=True,
-            )
+    args = parser.parse_args()
 
-    print(f"pipeline: cleaning up temporary directory {temp_organized}")
-    remove_empty_dirs(temp_organized)
-    shutil.rmtree(temp_organized)
+    asyncio.run(organize_and_classify(args.input, args.output, args.batch_size))
 
 
 if __name__ == "__main__":
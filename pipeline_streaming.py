@@ -0,0 +1,46 @@
+import asyncio
+import datetime
+import argparse
+
+from src.modules.pipeline.stream import run_streaming_pipeline
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Streaming pipeline: organize, classify, mask and validate each receipt as it goes"
+    )
+    parser.add_argument(
+        "-i",
+        "--input",
+        required=True,
+        help="Input directory containing files named FILE_NAME-NAME_SENDER.EXTENSION",
+    )
+    parser.add_argument(
+        "-o",
+        "--output",
+        required=True,
+        help="Output directory for validated masked files (person/bank/files structure)",
+    )
+    parser.add_argument(
+        "-c",
+        "--concurrency",
+        required=False,
+        type=int,
+        default=8,
+        help="number of files in flight in each stage",
+    )
+
+    args = parser.parse_args()
+
+    asyncio.run(run_streaming_pipeline(args.input, args.output, args.concurrency))
+
+
+if __name__ == "__main__":
+    start_time = datetime.datetime.now()
+    print(f"pipeline_streaming: 🚀 starting process at {start_time}")
+
+    main()
+
+    end_time = datetime.datetime.now()
+    total_time = end_time - start_time
+    print(f"pipeline_streaming: ✅  execution finished. Total time: {total_time}")
@@ -3,9 +3,7 @@ import datetime
 import os
 
 from src.modules.classify.output import move_files_to_specified_bank_folders
-from src.modules.classify.gemini import (
-    get_promises_of_all_files_to_find_out_bank_of_payment_receipts,
-)
+from src.modules.classify.gemini import classify_all_files
 from src.modules.classify.args import get_args
 
 
@@ -13,13 +11,10 @@ async def main():
     args = get_args()
     real_path = os.path.realpath(args.input)
 
-    all_files_promises = get_promises_of_all_files_to_find_out_bank_of_payment_receipts(
-        real_path
-    )
     print(
-        "receipt_organizer: executing all promises to find out which bank each payment receipt belongs to"
+        f"receipt_organizer: executing all promises to find out which bank each payment receipt belongs to, {args.batch_size} receipt(s) per request"
     )
-    results_from_models = await asyncio.gather(*all_files_promises)
+    results_from_models = await classify_all_files(real_path, args.batch_size)
 
     print(f"receipt_organizer: moving files to {args.output}")
     move_files_to_specified_bank_folders(results_from_models, args.output)
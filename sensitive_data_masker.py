@@ -13,7 +13,20 @@ async def main():
     real_path = os.path.realpath(args.input)
     output_dir = os.path.abspath(args.output)
 
-    await process_files_with_coordinate_matching(real_path, output_dir)
+    await process_files_with_coordinate_matching(
+        real_path,
+        output_dir,
+        args.concurrency,
+        {
+            "pdf_mask_mode": args.pdf_mask_mode,
+            "matcher": args.matcher,
+            "alignment": args.alignment,
+            "png_compression": args.png_compression,
+            "jpeg_quality": args.jpeg_quality,
+            "batch_size": args.batch_size,
+            "resume": not args.no_resume,
+        },
+    )
 
 
 if __name__ == "__main__":
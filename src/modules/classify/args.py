@@ -1,6 +1,13 @@
 import argparse
 
 
+def positive_int(value):
+    number = int(value)
+    if number < 1:
+        raise argparse.ArgumentTypeError(f"must be at least 1, got {value}")
+    return number
+
+
 def get_args():
     parser = argparse.ArgumentParser(description="llm-liaa-payment-receipt-classify")
     parser.add_argument(
@@ -16,5 +23,12 @@ def get_args():
         default="z_output",
         help="output path",
     )
+    parser.add_argument(
+        "--batch-size",
+        type=positive_int,
+        required=False,
+        default=1,
+        help="receipts sent to Gemini in a single request (1 = one request per receipt)",
+    )
     args = parser.parse_args()
     return args
@@ -0,0 +1,126 @@
+import difflib
+import os
+import re
+import unicodedata
+
+from src.modules.classify.banks import BANKS
+from src.modules.sensitive_data_masker.registry import COORDINATES_DIR
+
+MIN_SIMILARITY = 0.85
+# Words of legal names and answers that do not identify the bank
+IGNORED_WORDS = {
+    "a",
+    "banco",
+    "bank",
+    "bco",
+    "da",
+    "de",
+    "do",
+    "e",
+    "instituicao",
+    "ip",
+    "ltda",
+    "o",
+    "pagamento",
+    "pagamentos",
+    "s",
+    "sa",
+}
+# Words of several bank names: an alias reduced to them names no bank alone
+GENERIC_WORDS = {"brasil", "cooperativa", "cooperativo"}
+
+
+def split_words(name):
+    """
+    Lowercase ASCII words of name without punctuation
+    """
+    name = unicodedata.normalize("NFKD", name).encode("ASCII", "ignore").decode("ASCII")
+    return re.sub(r"[^a-z0-9&]+", " ", name.lower()).split()
+
+
+def normalize_bank_name(name):
+    """
+    Words of name without the ignored ones, e.g. 'Nu Pagamentos S.A.' -> 'nu'
+    """
+    return " ".join(word for word in split_words(name) if word not in IGNORED_WORDS)
+
+
+class BankNameIndex:
+    """
+    Maps the free-text bank of a classification to a canonical bank id: the
+    template folders of coordinates_dir plus the ids and aliases of the
+    known banks. An answer is looked up normalized, first exactly, then by
+    the aliases found as whole words of the answer (a single bank must
+    match) and at last by difflib similarity, so 'Nubank', 'Nu Pagamentos
+    S.A.' and 'nu' are all 'nu'. The word search uses the aliases with
+    their ignored words ('banco do brasil'), so 'Banco do Nordeste do
+    Brasil' is not taken for 'bb'
+    """
+
+    def __init__(self, coordinates_dir=COORDINATES_DIR, min_similarity=MIN_SIMILARITY):
+        self.min_similarity = min_similarity
+        self.aliases = {}
+        phrases = {}
+
+        bank_ids = list(BANKS)
+        if os.path.isdir(coordinates_dir):
+            bank_ids += sorted(
+                name
+                for name in os.listdir(coordinates_dir)
+                if os.path.isdir(os.path.join(coordinates_dir, name))
+            )
+
+        for bank_id in bank_ids:
+            for alias in [bank_id, *BANKS.get(bank_id, {}).get("aliases", [])]:
+                phrase = " ".join(split_words(alias))
+                if phrase:
+                    phrases.setdefault(phrase, bank_id)
+
+                normalized = normalize_bank_name(alias)
+                if normalized and not set(normalized.split()) <= GENERIC_WORDS:
+                    self.aliases.setdefault(normalized, bank_id)
+
+        self._patterns = [
+            (re.compile(rf"(?<![a-z0-9&]){re.escape(phrase)}(?![a-z0-9&])"), bank_id)
+            for phrase, bank_id in phrases.items()
+        ]
+
+    def lookup(self, name):
+        """
+        Returns:
+            str | None: canonical bank id of name, None when no bank or more
+            than one bank matches
+
+        >>> [bank_name_index.lookup(name) for name in [
+        ...     "Nubank", "Nu Pagamentos S.A.", "Banco do Brasil",
+        ...     "BCO DO BRASIL S.A.", "Banco Santander (Brasil) S.A.",
+        ...     "Banco Cooperativo Sicredi S.A.", "O banco é o Nubank."]]
+        ['nu', 'nu', 'bb', 'bb', 'santander', 'sicredi', 'nu']
+        >>> [bank_name_index.lookup(name) for name in [
+        ...     "Banco do Nordeste do Brasil", "Sicoob - Banco Cooperativo do Brasil",
+        ...     "Brasil", "Nubank e Itaú", "Banco Safra"]]
+        [None, None, None, None, None]
+        """
+        normalized = normalize_bank_name(name or "")
+        if not normalized:
+            return None
+
+        if normalized in self.aliases:
+            return self.aliases[normalized]
+
+        phrase = " ".join(split_words(name))
+        matches = {
+            bank_id for pattern, bank_id in self._patterns if pattern.search(phrase)
+        }
+        if len(matches) == 1:
+            return matches.pop()
+        if matches:
+            return None
+
+        close = difflib.get_close_matches(
+            normalized, self.aliases, n=1, cutoff=self.min_similarity
+        )
+        return self.aliases[close[0]] if close else None
+
+
+bank_name_index = BankNameIndex()
@@ -0,0 +1,99 @@
+import re
+
+# Bank id (same name as the template folders in src/config/coordinates) ->
+# names a classification may use for it, names printed by its app and CNPJs
+# of the institution. The ISPB used in Pix transaction IDs is the root
+# (first 8 digits) of the CNPJ
+BANKS = {
+    "nu": {
+        "aliases": ["nubank", "nu pagamentos", "nu financeira", "nu bank"],
+        "keywords": [r"nubank", r"nu pagamentos", r"nu financeira"],
+        "cnpjs": ["18.236.120/0001-58"],
+    },
+    "bb": {
+        "aliases": ["banco do brasil", "bb", "bco do brasil"],
+        "keywords": [
+            r"banco do brasil",
+            r"sisbb",
+            r"comprovante bb",
+            r"atendimento bb",
+        ],
+        "cnpjs": ["00.000.000/0001-91"],
+    },
+    "inter": {
+        "aliases": ["banco inter", "inter", "inter&co", "intermedium"],
+        "keywords": [r"banco inter", r"inter ?& ?co", r"bancointer"],
+        "cnpjs": ["00.416.968/0001-01"],
+    },
+    "itau": {
+        "aliases": ["itau", "itau unibanco", "banco itau"],
+        "keywords": [r"itau"],
+        "cnpjs": ["60.701.190/0001-04"],
+    },
+    "sicredi": {
+        "aliases": ["sicredi", "banco cooperativo sicredi", "cooperativa sicredi"],
+        "keywords": [r"sicredi"],
+        "cnpjs": ["01.181.521/0001-55"],
+    },
+    "xp": {
+        "aliases": ["xp", "banco xp", "xp investimentos"],
+        "keywords": [r"banco xp", r"xp investimentos"],
+        "cnpjs": ["02.332.886/0001-04", "33.264.668/0001-03"],
+    },
+    "99pay": {
+        "aliases": ["99pay", "99 pay"],
+        "keywords": [r"99 ?pay"],
+        "cnpjs": ["24.313.102/0001-25"],
+    },
+    "bradesco": {
+        "aliases": ["bradesco"],
+        "keywords": [r"bradesco"],
+        "cnpjs": ["60.746.948/0001-12"],
+    },
+    "caixa": {
+        "aliases": ["caixa", "caixa economica federal", "caixa tem", "cef"],
+        "keywords": [r"caixa economica", r"caixa tem"],
+        "cnpjs": ["00.360.305/0001-04"],
+    },
+    "santander": {
+        "aliases": ["santander"],
+        "keywords": [r"santander"],
+        "cnpjs": ["90.400.888/0001-42"],
+    },
+    "c6": {
+        "aliases": ["c6", "c6 bank", "banco c6"],
+        "keywords": [r"c6 ?bank", r"banco c6"],
+        "cnpjs": ["31.872.495/0001-72"],
+    },
+    "picpay": {
+        "aliases": ["picpay", "pic pay"],
+        "keywords": [r"picpay"],
+        "cnpjs": ["22.896.431/0001-10"],
+    },
+    "mercadopago": {
+        "aliases": ["mercado pago", "mercadopago"],
+        "keywords": [r"mercado ?pago"],
+        "cnpjs": ["10.573.521/0001-91"],
+    },
+    "pagbank": {
+        "aliases": ["pagbank", "pagseguro", "pag seguro"],
+        "keywords": [r"pagbank", r"pagseguro"],
+        "cnpjs": ["08.561.701/0001-01"],
+    },
+}
+
+
+def only_digits(value):
+    return re.sub(r"\D", "", value)
+
+
+KEYWORD_PATTERNS = {
+    bank_id: re.compile(r"\b(?:" + "|".join(bank["keywords"]) + r")\b")
+    for bank_id, bank in BANKS.items()
+}
+BANKS_BY_CNPJ = {
+    only_digits(cnpj): bank_id
+    for bank_id, bank in BANKS.items()
+    for cnpj in bank["cnpjs"]
+}
+BANKS_BY_ISPB = {cnpj[:8]: bank_id for cnpj, bank_id in BANKS_BY_CNPJ.items()}
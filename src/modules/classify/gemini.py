@@ -1,62 +1,332 @@
+import asyncio
+import json
 import os
 import pathlib
 
-from dotenv import load_dotenv
-import google.generativeai as genai
-from google.generativeai import types
-
-from src.modules.classify.prompt import get_prompt_find_out_bank_of_payment_receipts
+from src.modules.classify.local import (
+    build_local_classify_cache_key,
+    classify_bank_locally,
+)
+from src.modules.classify.prompt import (
+    get_prompt_find_out_bank_of_batch_of_payment_receipts,
+    get_prompt_find_out_bank_of_payment_receipts,
+)
+from src.utils.gemini_client import gemini_client, is_retryable
 from src.utils.mime_type import get_mime_type
+from src.utils.payload import payload_optimizer
+from src.utils.verdict_cache import build_cache_key, verdict_cache
 
-load_dotenv()
-gemini_api_key = os.getenv("GEMINI_API_KEY")
-
-genai.configure(api_key=gemini_api_key)
-gemini_client = genai.GenerativeModel(
-    model_name="gemini-2.5-flash",
-    generation_config=types.GenerationConfig(
-        response_mime_type="text/plain",
-    ),
-)
 prompt = get_prompt_find_out_bank_of_payment_receipts()
 
+DEFAULT_BATCH_SIZE = 1
+SOURCE_LOCAL = "local"
+SOURCE_CACHE = "cache"
+SOURCE_GEMINI = "gemini"
+SOURCE_ERROR = "error"
+
+
+def build_classify_cache_key(file_data):
+    """
+    Same key in single and batched mode, so both share their verdicts
+    """
+    return build_cache_key(
+        "classify",
+        gemini_client.model_name,
+        prompt,
+        file_data,
+        payload_optimizer.signature,
+    )
+
 
-async def get_bank_of_receipt(file_path: str, mime_type: str) -> str:
+async def get_known_bank(file_path, file_data, use_local=True):
+    """
+    Bank of a receipt known without Gemini: from the verdict cache, checked
+    first so re-runs skip the text extraction and OCR, or from the local
+    classifier when its text names a single bank. Local verdicts are cached
+    under their own key, tied to the bank table
+
+    Returns:
+        dict | None: {'classify', 'path', 'source'}, None when Gemini must
+        be asked
+    """
+    cached = await asyncio.to_thread(
+        verdict_cache.get, build_classify_cache_key(file_data)
+    )
+    if cached is not None:
+        return {
+            "classify": cached["classify"],
+            "path": file_path,
+            "source": SOURCE_CACHE,
+        }
+
+    if not use_local:
+        return None
+
+    local_key = build_local_classify_cache_key(file_data)
+    local = await asyncio.to_thread(verdict_cache.get, local_key)
+    if local is None:
+        local = await asyncio.to_thread(classify_bank_locally, file_path)
+        if not local:
+            return None
+        await asyncio.to_thread(verdict_cache.set, local_key, local)
+
+    return {"classify": local["classify"], "path": file_path, "source": SOURCE_LOCAL}
+
+
+async def get_bank_of_receipt(
+    file_path: str, mime_type: str, use_local: bool = True
+) -> str:
+    """
+    Bank of a receipt from the verdict cache, the local classifier when its
+    text names a single bank, or Gemini
+
+    Returns:
+        dict: {'classify', 'path', 'source'}
+    """
     try:
-        contents = [prompt]
         filepath = pathlib.Path(file_path)
-        contents.append({"mime_type": mime_type, "data": filepath.read_bytes()})
+        file_data = filepath.read_bytes()
 
-        response = await gemini_client.generate_content_async(contents=contents)
+        known = await get_known_bank(file_path, file_data, use_local)
+        if known:
+            return known
 
-        return {"classify": response.text, "path": file_path}
+        payload = await asyncio.to_thread(
+            payload_optimizer.get_payload, file_path, file_data, mime_type
+        )
+        contents = [prompt, *payload["parts"]]
+
+        response = await gemini_client.generate_content(
+            contents, response_mime_type="text/plain"
+        )
+        await asyncio.to_thread(
+            verdict_cache.set,
+            build_classify_cache_key(file_data),
+            {"classify": response.text},
+        )
+
+        return {"classify": response.text, "path": file_path, "source": SOURCE_GEMINI}
     except Exception as e:
         print(f"get_bank_of_receipt - error in {file_path}: {e}")
-        return {"classify": None, "path": file_path}
+        return {"classify": None, "path": file_path, "source": SOURCE_ERROR}
+
+
+async def get_banks_of_receipts(files):
+    """
+    Classify a batch of (file_path, mime_type): receipts already in the
+    verdict cache or classified locally are answered right away, the others
+    are sent together in a single request
+
+    Returns:
+        list: {'classify', 'path', 'source'} of each file, in the order of
+        files
+    """
+    results = [None] * len(files)
+    readable = []
+    for index, (file_path, mime_type) in enumerate(files):
+        try:
+            file_data = pathlib.Path(file_path).read_bytes()
+        except Exception as e:
+            print(f"get_banks_of_receipts - error in {file_path}: {e}")
+            results[index] = {
+                "classify": None,
+                "path": file_path,
+                "source": SOURCE_ERROR,
+            }
+            continue
+
+        readable.append((index, (file_path, mime_type, file_data)))
 
+    known = await asyncio.gather(
+        *[
+            get_known_bank(file_path, file_data)
+            for _, (file_path, _, file_data) in readable
+        ],
+        return_exceptions=True,
+    )
+
+    pending = []
+    for (index, item), result in zip(readable, known):
+        if isinstance(result, Exception):
+            print(f"get_banks_of_receipts - error in {item[0]}: {result}")
+            results[index] = {"classify": None, "path": item[0], "source": SOURCE_ERROR}
+        elif result:
+            results[index] = result
+        else:
+            pending.append((index, item))
+
+    if pending:
+        batch_results = await classify_batch([item for _, item in pending])
+        for (index, _), result in zip(pending, batch_results):
+            results[index] = result
+    return results
+
+
+async def classify_batch(items):
+    """
+    Send (file_path, mime_type, file_data) items in one request, each one
+    labeled with its index. A malformed answer (not a JSON array with one
+    bank per index) or a request rejected by the API (too large, a bad
+    attachment) is retried as two halves, down to single requests
+
+    Returns:
+        list: {'classify', 'path', 'source'} of each item, in order
+    """
+    if len(items) == 1:
+        file_path, mime_type, _ = items[0]
+        return [await get_bank_of_receipt(file_path, mime_type, use_local=False)]
 
-def get_promises_of_all_files_to_find_out_bank_of_payment_receipts(real_path: str):
-    tasks = []
     try:
-        for root, _, files in os.walk(real_path, followlinks=True):
-            for file in files:
-                mime_type = get_mime_type(file)
-
-                if not mime_type:
-                    print(
-                        f"get_promises_of_all_files_to_find_out_bank_of_payment_receipts file {file} without extension in {root}"
-                    )
-                    continue
-
-                all_path = os.path.join(root, file)
-                gemini_classify_task = get_bank_of_receipt(
-                    file_path=all_path,
-                    mime_type=mime_type,
+        payloads = await asyncio.gather(
+            *[
+                asyncio.to_thread(
+                    payload_optimizer.get_payload, file_path, file_data, mime_type
                 )
-                tasks.append(gemini_classify_task)
-        return tasks
+                for file_path, mime_type, file_data in items
+            ]
+        )
+        contents = [get_prompt_find_out_bank_of_batch_of_payment_receipts(len(items))]
+        for index, payload in enumerate(payloads):
+            contents.append(f"Comprovante {index}:")
+            contents.extend(payload["parts"])
+
+        response = await gemini_client.generate_content(contents)
+        banks = parse_batch_response(response.text, len(items))
+    except Exception as e:
+        # rate limits and server errors were already retried by the client,
+        # splitting would only multiply the failing requests
+        if is_retryable(e):
+            print(f"classify_batch - error in a batch of {len(items)} file(s): {e}")
+            return [
+                {"classify": None, "path": file_path, "source": SOURCE_ERROR}
+                for file_path, _, _ in items
+            ]
+        print(f"classify_batch - ⚠️ error in a batch of {len(items)} file(s): {e}")
+        banks = None
+
+    if banks is None:
+        middle = len(items) // 2
+        print(
+            f"classify_batch - ⚠️ batch of {len(items)} file(s) failed or malformed, retrying as {middle} + {len(items) - middle}"
+        )
+        first, second = await asyncio.gather(
+            classify_batch(items[:middle]), classify_batch(items[middle:])
+        )
+        return first + second
+
+    results = []
+    for (file_path, _, file_data), bank in zip(items, banks):
+        await asyncio.to_thread(
+            verdict_cache.set, build_classify_cache_key(file_data), {"classify": bank}
+        )
+        results.append({"classify": bank, "path": file_path, "source": SOURCE_GEMINI})
+    return results
+
+
+def parse_batch_response(text, count):
+    """
+    Returns:
+        list | None: bank of each index, or None when the answer does not
+        have exactly one non-empty bank for every index from 0 to count - 1
+    """
+    try:
+        answer = json.loads(text)
+    except (json.JSONDecodeError, TypeError):
+        return None
+
+    if not isinstance(answer, list):
+        return None
+
+    banks = {}
+    for entry in answer:
+        if not isinstance(entry, dict):
+            return None
+        index, bank = entry.get("index"), entry.get("bank")
+        if not isinstance(index, int) or not isinstance(bank, str) or not bank.strip():
+            return None
+        banks[index] = bank.strip()
+
+    if sorted(banks) != list(range(count)):
+        return None
+    return [banks[index] for index in range(count)]
+
+
+def list_receipt_files(real_path: str):
+    """
+    Returns:
+        list: (file_path, mime_type) of the files of real_path with a known
+        type
+    """
+    files = []
+    for root, _, names in os.walk(real_path, followlinks=True):
+        for file in names:
+            mime_type = get_mime_type(file)
+
+            if not mime_type:
+                print(
+                    f"get_promises_of_all_files_to_find_out_bank_of_payment_receipts file {file} without extension in {root}"
+                )
+                continue
+
+            files.append((os.path.join(root, file), mime_type))
+    return files
+
+
+def get_promises_of_all_files_to_find_out_bank_of_payment_receipts(
+    real_path: str, batch_size: int = DEFAULT_BATCH_SIZE
+):
+    """
+    One promise per file, or with batch_size > 1 one promise per batch of
+    files resolving to the list of their results
+    """
+    try:
+        files = list_receipt_files(real_path)
+        if batch_size > 1:
+            return [
+                get_banks_of_receipts(files[start : start + batch_size])
+                for start in range(0, len(files), batch_size)
+            ]
+
+        return [
+            get_bank_of_receipt(file_path=file_path, mime_type=mime_type)
+            for file_path, mime_type in files
+        ]
     except Exception as e:
         print(
             f"get_promises_of_all_files_to_find_out_bank_of_payment_receipts - error: {e}"
         )
         raise e
+
+
+async def classify_all_files(real_path: str, batch_size: int = DEFAULT_BATCH_SIZE):
+    """
+    Returns:
+        list: {'classify', 'path', 'source'} of every file of real_path
+    """
+    results = await asyncio.gather(
+        *get_promises_of_all_files_to_find_out_bank_of_payment_receipts(
+            real_path, batch_size
+        )
+    )
+    if batch_size > 1:
+        results = [result for batch in results for result in batch]
+
+    print_classification_sources(results)
+    return results
+
+
+def print_classification_sources(results):
+    if not results:
+        return
+
+    counts = {SOURCE_LOCAL: 0, SOURCE_CACHE: 0, SOURCE_GEMINI: 0, SOURCE_ERROR: 0}
+    for result in results:
+        counts[result["source"]] += 1
+
+    print(
+        f"classify: {len(results)} file(s), "
+        f"{counts[SOURCE_LOCAL]} ({counts[SOURCE_LOCAL] / len(results):.0%}) classified locally, "
+        f"{counts[SOURCE_CACHE]} ({counts[SOURCE_CACHE] / len(results):.0%}) from the verdict cache, "
+        f"{counts[SOURCE_GEMINI]} ({counts[SOURCE_GEMINI] / len(results):.0%}) by Gemini, "
+        f"{counts[SOURCE_ERROR]} ({counts[SOURCE_ERROR] / len(results):.0%}) failed"
+    )
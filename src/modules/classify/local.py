@@ -0,0 +1,113 @@
+import json
+import re
+import unicodedata
+
+from src.modules.classify.banks import (
+    BANKS,
+    BANKS_BY_CNPJ,
+    BANKS_BY_ISPB,
+    KEYWORD_PATTERNS,
+)
+from src.modules.guardrails.local import extract_text, is_valid_cnpj
+from src.utils.verdict_cache import build_cache_key, hash_bytes
+
+# Bump when the matching below changes; edits of the bank table change the
+# signature on their own
+LOCAL_CLASSIFIER_VERSION = 1
+LOCAL_CLASSIFIER_SIGNATURE = hash_bytes(
+    json.dumps([LOCAL_CLASSIFIER_VERSION, BANKS], sort_keys=True).encode()
+)
+
+CNPJ_PATTERN = re.compile(r"(?<![\d.])\d{2}\.?\d{3}\.?\d{3}/?\d{4}-?\d{2}(?![\d.])")
+TRANSACTION_ID_PATTERN = re.compile(
+    r"(?<![a-z0-9])e(\d{8})\d{12}[a-z0-9]{11}(?![a-z0-9])"
+)
+INSTITUTION_LABEL_PATTERN = re.compile(r"^\s*(?:instituicao|banco\s*:)[^:]*:?\s*(.*)$")
+
+
+def classify_bank_locally(file_path):
+    """
+    Offline first pass of the classification: the text of the file (PDF
+    text layer, or Tesseract OCR for images when pytesseract is installed)
+    is matched against the names, CNPJs and ISPBs (in the Pix transaction
+    ID) of the known banks. The institution fields of the payer and payee
+    name other banks, so they are left out. A file is classified only when
+    exactly one bank is found, the others go to Gemini
+
+    Returns:
+        dict | None: {'classify': bank id, 'reason': str} on a single bank,
+        None when the file is ambiguous
+    """
+    text = extract_text(file_path)
+    if not text:
+        return None
+
+    signals = find_bank_signals(text)
+    if len(signals) != 1:
+        return None
+
+    bank_id, found = next(iter(signals.items()))
+    return {
+        "classify": bank_id,
+        "reason": f"local classification found {', '.join(sorted(found))}",
+    }
+
+
+def build_local_classify_cache_key(file_data):
+    """
+    Key of local verdicts in the verdict cache, separate from the Gemini
+    key, so an edit of the bank table is a cache miss
+    """
+    return build_cache_key("classify_local", LOCAL_CLASSIFIER_SIGNATURE, file_data)
+
+
+def find_bank_signals(text):
+    """
+    Returns:
+        dict: kinds of evidence ('name', 'CNPJ', 'ISPB') found per bank id
+    """
+    text = remove_institution_fields(normalize_text(text))
+    signals = {}
+
+    for bank_id, pattern in KEYWORD_PATTERNS.items():
+        if pattern.search(text):
+            signals.setdefault(bank_id, set()).add("name")
+
+    for match in CNPJ_PATTERN.finditer(text):
+        digits = re.sub(r"\D", "", match.group())
+        bank_id = BANKS_BY_CNPJ.get(digits)
+        if bank_id and is_valid_cnpj(digits):
+            signals.setdefault(bank_id, set()).add("CNPJ")
+
+    for match in TRANSACTION_ID_PATTERN.finditer(text):
+        bank_id = BANKS_BY_ISPB.get(match.group(1))
+        if bank_id:
+            signals.setdefault(bank_id, set()).add("ISPB")
+
+    return signals
+
+
+def normalize_text(text):
+    text = unicodedata.normalize("NFKD", text).encode("ASCII", "ignore").decode("ASCII")
+    return text.lower()
+
+
+def remove_institution_fields(text):
+    """
+    Drops 'Instituição: X' / 'Banco: X' lines, and the next line when the
+    label has no value on its own line
+    """
+    kept = []
+    skip_value = False
+    for line in text.splitlines():
+        if skip_value and line.strip():
+            skip_value = False
+            continue
+
+        label = INSTITUTION_LABEL_PATTERN.match(line)
+        if label:
+            skip_value = not label.group(1).strip()
+            continue
+
+        kept.append(line)
+    return "\n".join(kept)
@@ -2,6 +2,8 @@ import os
 import shutil
 import unicodedata
 
+from src.modules.classify.bank_names import bank_name_index
+
 
 def format_folder_name(name):
     folder_name = "".join(
@@ -16,6 +18,14 @@ def format_folder_name(name):
     return folder_name.lower()
 
 
+def to_bank_folder_name(classify):
+    """
+    Canonical bank id of a classification (the template folder name), or
+    the formatted answer when it does not match a known bank
+    """
+    return bank_name_index.lookup(classify) or format_folder_name(classify)
+
+
 def move_files_to_specified_bank_folders(results_from_models, output_path):
     created_folders = set()
 
@@ -24,7 +34,7 @@ def move_files_to_specified_bank_folders(results_from_models, output_path):
 
         folder_name = "unknown_classification"
         if classify:
-            folder_name = format_folder_name(classify)
+            folder_name = to_bank_folder_name(classify)
 
         classification_folder_path = os.path.join(output_path, folder_name)
 
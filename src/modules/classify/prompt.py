@@ -3,3 +3,12 @@ def get_prompt_find_out_bank_of_payment_receipts() -> str:
     Você é um especialista em bancos e comprovantes de pagamentos Pix, sua função é receber um comprovante (imagem ou PDF), e identificar de qual banco é aquele comprovante de pagamento Pix.
     Responda apenas com o nome do banco, sem nenhuma outra informação adicional.
     """
+
+
+def get_prompt_find_out_bank_of_batch_of_payment_receipts(count: int) -> str:
+    return f"""
+    Você é um especialista em bancos e comprovantes de pagamentos Pix, sua função é receber {count} comprovantes (imagens ou PDFs), e identificar de qual banco é cada comprovante de pagamento Pix.
+    Cada comprovante é precedido pela sua identificação "Comprovante N", com N de 0 a {count - 1}, e pode ter mais de uma imagem (páginas de um PDF).
+    Responda apenas com um array JSON com um objeto por comprovante, na mesma ordem, sem nenhuma outra informação adicional:
+    [{{"index": 0, "bank": "nome do banco"}}]
+    """
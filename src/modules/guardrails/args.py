@@ -0,0 +1,29 @@
+import argparse
+
+
+def get_args():
+    parser = argparse.ArgumentParser(
+        description="Validate masked files for sensitive data"
+    )
+    parser.add_argument(
+        "-i",
+        "--input",
+        required=True,
+        help="Directory containing masked files to validate",
+    )
+    parser.add_argument(
+        "-o",
+        "--output",
+        required=True,
+        help="Directory to copy files that passed validation",
+    )
+    parser.add_argument(
+        "-c",
+        "--concurrency",
+        required=False,
+        type=int,
+        default=8,
+        help="number of files validated at the same time",
+    )
+    args = parser.parse_args()
+    return args
@@ -0,0 +1,158 @@
+import asyncio
+import os
+import shutil
+import time
+
+from src.modules.guardrails.gemini import check_sensitive_data
+from src.modules.guardrails.local import check_sensitive_data_locally
+
+DEFAULT_CONCURRENCY = 8
+
+
+async def process_files(
+    input_dir, output_dir, concurrency=DEFAULT_CONCURRENCY, verified_paths=None
+):
+    """
+    Validate all files in input directory concurrently, moving each file as
+    soon as its verdict arrives
+
+    Args:
+        input_dir: Directory with masked files to validate
+        output_dir: Directory to move files that passed validation
+        concurrency: Number of files validated at the same time
+        verified_paths: Masked files already verified locally (redacted
+            PDFs with no text left under the masks), moved without Gemini
+            when the local check finds no sensitive data in their whole text
+
+    Returns:
+        dict: Statistics about the validation
+    """
+    queue = asyncio.Queue()
+    for root, _, files in os.walk(input_dir):
+        for file in files:
+            _, ext = os.path.splitext(file)
+            if ext.lower() not in [
+                ".png",
+                ".jpg",
+                ".jpeg",
+                ".pdf",
+            ]:
+                continue
+
+            queue.put_nowait(os.path.join(root, file))
+
+    print(
+        f"guardrails: {queue.qsize()} file(s) to validate with concurrency {concurrency}"
+    )
+
+    results = []
+    verified_paths = set(verified_paths or [])
+    start_time = time.perf_counter()
+    workers = [
+        asyncio.create_task(
+            validate_worker(queue, input_dir, output_dir, verified_paths, results)
+        )
+        for _ in range(max(1, concurrency))
+    ]
+    await asyncio.gather(*workers)
+    elapsed = time.perf_counter() - start_time
+
+    stats = build_stats(results, elapsed)
+    print_stats(stats)
+    return stats
+
+
+async def validate_worker(queue, input_dir, output_dir, verified_paths, results):
+    while True:
+        try:
+            file_path = queue.get_nowait()
+        except asyncio.QueueEmpty:
+            return
+
+        results.append(
+            await validate_file(
+                file_path, input_dir, output_dir, file_path in verified_paths
+            )
+        )
+
+
+async def validate_file(file_path, input_dir, output_dir, verified=False):
+    rel_path = os.path.relpath(file_path, input_dir)
+
+    print(f"guardrails: validating '{rel_path}' 🔍")
+    start_time = time.perf_counter()
+    loop = asyncio.get_running_loop()
+    result = await loop.run_in_executor(None, check_sensitive_data_locally, file_path)
+    local_hit = result is not None
+    if not local_hit and verified:
+        result = {
+            "has_sensitive_data": False,
+            "reason": "redaction verified locally and no sensitive data in the text, Gemini check skipped",
+        }
+    elif not local_hit:
+        result = await check_sensitive_data(file_path)
+    latency = time.perf_counter() - start_time
+
+    passed = not result["has_sensitive_data"]
+    if passed:
+        output_file_path = os.path.join(output_dir, rel_path)
+        os.makedirs(os.path.dirname(output_file_path), exist_ok=True)
+        shutil.move(file_path, output_file_path)
+        print(
+            f"guardrails: '{rel_path}' all data masked - {result['reason']} ({latency:.2f}s) ✅"
+        )
+    else:
+        print(
+            f"guardrails: '{rel_path}' sensitive data found - {result['reason']} ({latency:.2f}s) ⚠️"
+        )
+
+    return {
+        "path": rel_path,
+        "passed": passed,
+        "latency": latency,
+        "verified": verified and not local_hit,
+        "local_hit": local_hit,
+    }
+
+
+def build_stats(results, elapsed):
+    latencies = sorted(result["latency"] for result in results)
+    total = len(results)
+
+    def percentile(fraction):
+        if not latencies:
+            return 0.0
+        return latencies[min(total - 1, int(fraction * total))]
+
+    return {
+        "total": total,
+        "passed": sum(1 for result in results if result["passed"]),
+        "failed": sum(1 for result in results if not result["passed"]),
+        "verified_locally": sum(1 for result in results if result["verified"]),
+        "failed_locally": sum(1 for result in results if result["local_hit"]),
+        "elapsed": elapsed,
+        "throughput_per_minute": total / elapsed * 60 if elapsed > 0 else 0.0,
+        "latency_avg": sum(latencies) / total if total else 0.0,
+        "latency_p50": percentile(0.5),
+        "latency_p95": percentile(0.95),
+        "latency_max": latencies[-1] if latencies else 0.0,
+    }
+
+
+def print_stats(stats):
+    print(f"\n{'=' * 60}")
+    print("📊 GUARDRAILS REPORT")
+    print(f"{'=' * 60}")
+    print(f"✅ passed        : {stats['passed']:>5} file(s)")
+    print(f"⚠️ failed        : {stats['failed']:>5} file(s)")
+    print(f"🔒 local checks  : {stats['verified_locally']:>5} file(s) without Gemini")
+    print(
+        f"🔎 local hits    : {stats['failed_locally']:>5} file(s) failed without Gemini"
+    )
+    print(
+        f"⏱️ latency       : avg {stats['latency_avg']:.2f}s, p50 {stats['latency_p50']:.2f}s, p95 {stats['latency_p95']:.2f}s, max {stats['latency_max']:.2f}s"
+    )
+    print(
+        f"🚀 throughput    : {stats['throughput_per_minute']:.1f} file(s)/min in {stats['elapsed']:.1f}s"
+    )
+    print(f"{'=' * 60}\n")
@@ -0,0 +1,64 @@
+import asyncio
+import json
+
+from src.utils.gemini_client import gemini_client
+from src.utils.payload import payload_optimizer
+from src.utils.verdict_cache import build_cache_key, verdict_cache
+
+
+async def check_sensitive_data(file_path):
+    """
+    Check if file contains visible sensitive data using Gemini
+
+    Returns:
+        dict: {'has_sensitive_data': bool, 'reason': str}
+    """
+    try:
+        prompt = """Analise esta imagem de comprovante bancário e verifique se há DADOS SENSÍVEIS VISÍVEIS.
+
+Dados sensíveis incluem:
+- Nome completo de pessoas
+- CPF
+- Chave Pix (CPF, email, telefone, chave aleatória)
+- Número de conta bancária
+- Agência
+- Identificador da transação
+
+Retorne um JSON com:
+{
+    "has_sensitive_data": true/false,
+    "reason": "explicação do que foi encontrado ou confirmação de que tudo está mascarado"
+}
+
+Se TODOS os dados sensíveis estiverem cobertos por tarjas pretas, retorne has_sensitive_data=false.
+Se QUALQUER dado sensível estiver visível, retorne has_sensitive_data=true."""
+
+        with open(file_path, "rb") as f:
+            file_data = f.read()
+
+        cache_key = build_cache_key(
+            "guardrails",
+            gemini_client.model_name,
+            prompt,
+            file_data,
+            payload_optimizer.signature,
+        )
+        cached = await asyncio.to_thread(verdict_cache.get, cache_key)
+        if cached is not None:
+            return cached
+
+        payload = await asyncio.to_thread(
+            payload_optimizer.get_payload, file_path, file_data
+        )
+        contents = [prompt, *payload["parts"]]
+
+        response = await gemini_client.generate_content(contents)
+        result = json.loads(response.text)
+        await asyncio.to_thread(verdict_cache.set, cache_key, result)
+        return result
+
+    except Exception as e:
+        return {
+            "has_sensitive_data": True,
+            "reason": f"Error during check: {str(e)}",
+        }
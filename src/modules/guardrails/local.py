@@ -0,0 +1,171 @@
+import os
+import re
+
+import fitz
+
+from src.utils.fitz_lock import fitz_lock
+
+try:
+    import pytesseract
+    from PIL import Image
+except ImportError:
+    pytesseract = None
+
+OCR_LANGUAGE = "por"
+
+CPF_PATTERN = re.compile(r"(?<![\d.])\d{3}\.?\d{3}\.?\d{3}-?\d{2}(?![\d.])")
+EMAIL = r"[\w.+-]+@[\w-]+(?:\.[\w-]+)+"
+PHONE = (
+    r"(?<!\d)(?:\+55\s?)?\(?\d{2}\)?\s?9?\d{4}[-\s]\d{4}(?!\d)"
+    r"|\+55\s?\d{2}\s?9?\d{8}(?!\d)"
+)
+# Pix key fields may have the value on the next line, contact fields of the
+# payer/payee need a separator after the label
+PIX_KEY_LABEL = r"chave\s*pix\s*[:\-]?\s*"
+PERSON_FIELD = (
+    r"(?:\s+d[oa]\s+(?:pagador|recebedor|destinat[aá]rio|favorecido))?\s*[:\-]\s*"
+)
+EMAIL_FIELD_PATTERN = re.compile(
+    rf"(?:{PIX_KEY_LABEL}|e-?mail{PERSON_FIELD})({EMAIL})", re.IGNORECASE
+)
+PHONE_FIELD_PATTERN = re.compile(
+    rf"(?:{PIX_KEY_LABEL}|(?:telefone|celular){PERSON_FIELD})({PHONE})",
+    re.IGNORECASE,
+)
+PIX_RANDOM_KEY_PATTERN = re.compile(
+    r"(?<![\w-])[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}(?![\w-])",
+    re.IGNORECASE,
+)
+TRANSACTION_ID_PATTERN = re.compile(
+    r"(?<![A-Za-z0-9])E\d{20}[A-Za-z0-9]{11}(?![A-Za-z0-9])"
+)
+PIX_KEY_CNPJ_PATTERN = re.compile(
+    r"chave\s*pix\s*[:\-]?\s*(\d{2}\.?\d{3}\.?\d{3}/?\d{4}-?\d{2})(?![\d.])",
+    re.IGNORECASE,
+)
+ACCOUNT_PATTERN = re.compile(
+    r"conta(?:\s+corrente|\s+pagamento|\s+poupan[çc]a)?\s*[:\-]?\s*\d{4,12}-?[\dxX]?(?!\d)",
+    re.IGNORECASE,
+)
+
+# CNPJs, phones and emails of the banks (SAC, Ouvidoria) and companies are
+# printed on every receipt and are public, so they only count when used as
+# a Pix key or in a contact field of the payer/payee. An agency alone is not
+# a hit either: templates may leave the public agency of a company payee
+# visible (e.g. 'AGENCIA: 0001'), so those files go to Gemini
+DEFINITE_PATTERNS = {
+    "email": EMAIL_FIELD_PATTERN,
+    "phone": PHONE_FIELD_PATTERN,
+    "pix random key": PIX_RANDOM_KEY_PATTERN,
+    "transaction id": TRANSACTION_ID_PATTERN,
+    "account": ACCOUNT_PATTERN,
+}
+
+
+def check_sensitive_data_locally(file_path):
+    """
+    Offline first pass of the guardrail: regexes for CPF, CNPJ/phone/email
+    Pix keys, phones and emails of the payer/payee, Pix random keys, transaction IDs and account
+    numbers over the text of the file (PDF text layer, or Tesseract OCR for images when pytesseract is
+    installed). A hit means the data is still readable, so the file fails
+    without asking Gemini. No hit is not proof of a clean file (names and
+    images inside PDFs are not covered), so those go to Gemini
+
+    Returns:
+        dict | None: {'has_sensitive_data': True, 'reason': str} on a
+        definite hit, None when the file is ambiguous
+    """
+    text = extract_text(file_path)
+    if not text:
+        return None
+
+    found = find_sensitive_data(text)
+    if not found:
+        return None
+
+    summary = ", ".join(f"{count} {kind}" for kind, count in sorted(found.items()))
+    return {
+        "has_sensitive_data": True,
+        "reason": f"local check found readable {summary}",
+    }
+
+
+def find_sensitive_data(text):
+    """
+    Returns:
+        dict: number of definite hits per kind of sensitive data
+    """
+    found = {}
+
+    def add(kind):
+        found[kind] = found.get(kind, 0) + 1
+
+    for match in CPF_PATTERN.finditer(text):
+        if is_valid_cpf(match.group()):
+            add("CPF")
+
+    for match in PIX_KEY_CNPJ_PATTERN.finditer(text):
+        if is_valid_cnpj(match.group(1)):
+            add("pix key (CNPJ)")
+
+    for kind, pattern in DEFINITE_PATTERNS.items():
+        for _ in pattern.finditer(text):
+            add(kind)
+
+    return found
+
+
+def is_valid_cpf(value):
+    digits = [int(digit) for digit in re.sub(r"\D", "", value)]
+    if len(digits) != 11 or len(set(digits)) == 1:
+        return False
+
+    for position in (9, 10):
+        total = sum(
+            digit * weight
+            for digit, weight in zip(digits[:position], range(position + 1, 1, -1))
+        )
+        check = total * 10 % 11 % 10
+        if digits[position] != check:
+            return False
+    return True
+
+
+def is_valid_cnpj(value):
+    digits = [int(digit) for digit in re.sub(r"\D", "", value)]
+    if len(digits) != 14 or len(set(digits)) == 1:
+        return False
+
+    weights = [6, 5, 4, 3, 2, 9, 8, 7, 6, 5, 4, 3, 2]
+    for position in (12, 13):
+        total = sum(
+            digit * weight
+            for digit, weight in zip(digits[:position], weights[13 - position :])
+        )
+        check = 0 if total % 11 < 2 else 11 - total % 11
+        if digits[position] != check:
+            return False
+    return True
+
+
+def extract_text(file_path):
+    """
+    Returns:
+        str | None: text of the file, None when it can not be read locally
+    """
+    ext = os.path.splitext(file_path)[1].lower()
+    try:
+        if ext == ".pdf":
+            with fitz_lock, fitz.open(file_path) as doc:
+                return "\n".join(page.get_text() for page in doc)
+
+        if pytesseract is None:
+            return None
+        with Image.open(file_path) as image:
+            try:
+                return pytesseract.image_to_string(image, lang=OCR_LANGUAGE)
+            except pytesseract.TesseractError:
+                return pytesseract.image_to_string(image)
+    except Exception as e:
+        print(f"guardrails: could not read text of '{file_path}' locally: {e} ⚠️")
+        return None
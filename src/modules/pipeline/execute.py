@@ -0,0 +1,100 @@
+import os
+import shutil
+
+from file_organizer import organize_files
+from src.modules.classify.gemini import DEFAULT_BATCH_SIZE, classify_all_files
+from src.modules.classify.output import move_files_to_specified_bank_folders
+from src.modules.guardrails.execute import process_files
+from src.modules.sensitive_data_masker.execute import (
+    DEFAULT_CONCURRENCY,
+    process_files_with_coordinate_matching,
+)
+from src.utils.dirs import remove_empty_dirs
+
+TEMP_ORGANIZED_DIR = "z_temp_organized"
+TEMP_MASKED_DIR = "z_temp_masked_files"
+
+
+async def organize_and_classify(input_dir, output_dir, batch_size=DEFAULT_BATCH_SIZE):
+    """
+    Organize files by sender name, then classify every person folder by bank
+    in a single concurrent pass
+    """
+    temp_organized = os.path.abspath(TEMP_ORGANIZED_DIR)
+
+    print(f"pipeline: organizing files {input_dir} into {temp_organized}")
+    organize_files(os.path.abspath(input_dir), temp_organized)
+
+    print(
+        f"pipeline: classifying all person folders of {temp_organized} into {output_dir}"
+    )
+    results_from_models = await classify_all_files(temp_organized, batch_size)
+
+    results_by_person = {}
+    for result in results_from_models:
+        rel_path = os.path.relpath(result["path"], temp_organized)
+        person_folder = rel_path.split(os.sep)[0]
+        results_by_person.setdefault(person_folder, []).append(result)
+
+    for person_folder, results in results_by_person.items():
+        output_person_path = os.path.join(output_dir, person_folder)
+        print(f"pipeline: moving files of {person_folder} to {output_person_path}")
+        move_files_to_specified_bank_folders(results, output_person_path)
+
+    print(f"pipeline: cleaning up temporary directory {temp_organized}")
+    remove_empty_dirs(temp_organized)
+    shutil.rmtree(temp_organized)
+
+
+async def mask_and_validate(input_dir, output_dir, concurrency=DEFAULT_CONCURRENCY):
+    """
+    Mask sensitive data into a temporary folder, validate it with guardrails
+    and remove from the input every file that reached the output
+    """
+    temp_masked_dir = os.path.abspath(TEMP_MASKED_DIR)
+    output_dir = os.path.abspath(output_dir)
+
+    print(f"pipeline_2: masking files from {input_dir} into {temp_masked_dir}")
+    # the temporary folder keeps the outputs rejected by the guardrails, so
+    # they are not taken as done by the next run
+    mask_results = await process_files_with_coordinate_matching(
+        os.path.realpath(input_dir),
+        temp_masked_dir,
+        concurrency,
+        {"resume": False},
+    )
+    verified_paths = {
+        result["output_path"]
+        for result in mask_results.values()
+        if result and result["verified"]
+    }
+
+    print(
+        f"pipeline_2: validating masked files from {temp_masked_dir} into {output_dir}"
+    )
+    os.makedirs(output_dir, exist_ok=True)
+    if os.path.exists(temp_masked_dir):
+        await process_files(temp_masked_dir, output_dir, concurrency, verified_paths)
+
+    remove_processed_files(input_dir, output_dir)
+    remove_empty_dirs(input_dir)
+    if os.path.exists(temp_masked_dir):
+        remove_empty_dirs(temp_masked_dir)
+
+
+def remove_processed_files(input_dir, output_dir):
+    """
+    Remove files from input directory that successfully reached output directory
+
+    Args:
+        input_dir: Source directory to remove files from
+        output_dir: Directory with successfully processed files
+    """
+    for root, _, files in os.walk(output_dir):
+        for file in files:
+            output_file_path = os.path.join(root, file)
+            rel_path = os.path.relpath(output_file_path, output_dir)
+            input_file_path = os.path.join(input_dir, rel_path)
+
+            if os.path.exists(input_file_path):
+                os.remove(input_file_path)
@@ -0,0 +1,181 @@
+import asyncio
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from file_organizer import extract_name_from_filename
+from src.modules.classify.gemini import get_bank_of_receipt
+from src.modules.classify.output import to_bank_folder_name
+from src.modules.guardrails.execute import validate_file
+from src.modules.sensitive_data_masker.assets import template_asset_store
+from src.modules.sensitive_data_masker.execute import (
+    DEFAULT_CONCURRENCY,
+    create_mask_batcher,
+    create_page_executor,
+    mask_single_file,
+)
+from src.utils.dirs import remove_empty_dirs
+from src.utils.mime_type import get_mime_type
+
+TEMP_MASKED_DIR = "z_temp_masked_files"
+
+STOP = object()
+
+
+async def run_streaming_pipeline(
+    input_dir, output_dir, concurrency=DEFAULT_CONCURRENCY
+):
+    """
+    Organize, classify, mask and validate each receipt as it moves through
+    bounded queues, so a file can be validated while others are still being
+    classified. Files that do not reach the output stay in the input folder
+    for the next run
+
+    Returns:
+        dict: Statistics about the run
+    """
+    input_dir = os.path.realpath(input_dir)
+    output_dir = os.path.abspath(output_dir)
+    staging_dir = os.path.abspath(TEMP_MASKED_DIR)
+
+    stats = {
+        "files": 0,
+        "unclassified": 0,
+        "not_masked": 0,
+        "rejected": 0,
+        "validated": 0,
+        "first_result_seconds": None,
+    }
+    start_time = time.perf_counter()
+
+    classify_queue = asyncio.Queue(maxsize=concurrency * 2)
+    mask_queue = asyncio.Queue(maxsize=concurrency * 2)
+    guardrail_queue = asyncio.Queue(maxsize=concurrency * 2)
+
+    async def organize():
+        try:
+            for root, _, files in os.walk(input_dir, followlinks=True):
+                for file in files:
+                    if not get_mime_type(file):
+                        continue
+                    person_name = extract_name_from_filename(file)
+                    if not person_name:
+                        continue
+
+                    stats["files"] += 1
+                    await classify_queue.put(
+                        {"path": os.path.join(root, file), "person": person_name}
+                    )
+        finally:
+            await classify_queue.put(STOP)
+
+    async def classify(item):
+        result = await get_bank_of_receipt(item["path"], get_mime_type(item["path"]))
+        if not result["classify"]:
+            stats["unclassified"] += 1
+            print(f"pipeline_streaming: '{item['path']}' not classified ⚠️")
+            return None
+
+        item["bank"] = to_bank_folder_name(result["classify"])
+        return item
+
+    async def mask(item):
+        rel_path = os.path.join(
+            item["person"], item["bank"], os.path.basename(item["path"])
+        )
+        staged_path = os.path.join(staging_dir, rel_path)
+        result = await mask_single_file(
+            item["path"],
+            item["bank"],
+            staged_path,
+            executor,
+            page_executor,
+            batcher=batcher,
+        )
+        if not result:
+            stats["not_masked"] += 1
+            return None
+
+        item["staged_path"] = staged_path
+        item["verified"] = result["verified"]
+        return item
+
+    async def guardrail(item):
+        result = await validate_file(
+            item["staged_path"], staging_dir, output_dir, item["verified"]
+        )
+        if not result["passed"]:
+            stats["rejected"] += 1
+            return None
+
+        os.remove(item["path"])
+        stats["validated"] += 1
+        if stats["first_result_seconds"] is None:
+            stats["first_result_seconds"] = time.perf_counter() - start_time
+        return None
+
+    with (
+        ThreadPoolExecutor(max_workers=os.cpu_count()) as executor,
+        create_page_executor() as page_executor,
+    ):
+        batcher = create_mask_batcher(executor, page_executor)
+        try:
+            # Stages drain what was queued before an error of the walk is raised
+            results = await asyncio.gather(
+                organize(),
+                run_stage(classify, classify_queue, mask_queue, concurrency),
+                run_stage(mask, mask_queue, guardrail_queue, concurrency),
+                run_stage(guardrail, guardrail_queue, None, concurrency),
+                return_exceptions=True,
+            )
+            for result in results:
+                if isinstance(result, BaseException):
+                    raise result
+        finally:
+            await asyncio.to_thread(template_asset_store.release)
+
+    remove_empty_dirs(input_dir)
+    if os.path.exists(staging_dir):
+        remove_empty_dirs(staging_dir)
+
+    stats["elapsed"] = time.perf_counter() - start_time
+    print_stats(stats)
+    return stats
+
+
+async def run_stage(handler, input_queue, output_queue, workers):
+    async def worker():
+        while True:
+            item = await input_queue.get()
+            if item is STOP:
+                await input_queue.put(STOP)
+                return
+
+            try:
+                result = await handler(item)
+            except Exception as e:
+                print(f"pipeline_streaming: error processing '{item['path']}': {e}")
+                continue
+
+            if result is not None and output_queue is not None:
+                await output_queue.put(result)
+
+    await asyncio.gather(*[worker() for _ in range(max(1, workers))])
+    if output_queue is not None:
+        await output_queue.put(STOP)
+
+
+def print_stats(stats):
+    first_result = stats["first_result_seconds"]
+    print(f"\n{'=' * 60}")
+    print("📊 STREAMING PIPELINE REPORT")
+    print(f"{'=' * 60}")
+    print(f"📄 files         : {stats['files']:>5}")
+    print(f"❓ unclassified  : {stats['unclassified']:>5}")
+    print(f"⚠️ not masked    : {stats['not_masked']:>5}")
+    print(f"❌ rejected      : {stats['rejected']:>5}")
+    print(f"✅ validated     : {stats['validated']:>5}")
+    if first_result is not None:
+        print(f"⏱️ first result  : {first_result:.1f}s")
+    print(f"⏱️ total         : {stats['elapsed']:.1f}s")
+    print(f"{'=' * 60}\n")
@@ -0,0 +1,118 @@
+import cv2
+import numpy as np
+
+ALIGNMENT_WIDTH = 720
+ORB_FEATURES = 1000
+MIN_INLIERS = 25
+MIN_INLIER_RATIO = 0.3
+MAX_SCALE_CHANGE = 2.0
+MAX_ROTATION_DEGREES = 3.0
+
+
+def compute_alignment_features(image, boxes=None):
+    """
+    ORB keypoints and descriptors of an image downscaled to ALIGNMENT_WIDTH.
+    The boxes (x, y, width, height, in image pixels) are left out of the
+    detection: on a template they hold the sensitive data, which changes
+    from one receipt to the next and only produces wrong matches
+
+    Returns:
+        dict: {'points': (N, 2) float32 array in downscaled pixels,
+        'descriptors': array | None, 'scale': float}
+    """
+    gray = image if image.ndim == 2 else cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+    scale = min(1.0, ALIGNMENT_WIDTH / gray.shape[1])
+    if scale < 1.0:
+        gray = cv2.resize(gray, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA)
+
+    mask = None
+    if boxes is not None and len(boxes):
+        mask = np.full(gray.shape, 255, dtype=np.uint8)
+        for x, y, width, height in (np.asarray(boxes) * scale).astype(np.int64):
+            mask[
+                max(0, y) : max(0, y + height + 1), max(0, x) : max(0, x + width + 1)
+            ] = 0
+
+    orb = cv2.ORB_create(nfeatures=ORB_FEATURES)
+    keypoints, descriptors = orb.detectAndCompute(gray, mask)
+    points = np.array([keypoint.pt for keypoint in keypoints], dtype=np.float32)
+    return {"points": points.reshape(-1, 2), "descriptors": descriptors, "scale": scale}
+
+
+def estimate_alignment(reference_features, input_features):
+    """
+    Similarity transform (translation, uniform scale and a small rotation)
+    from reference pixels to input pixels, estimated with RANSAC over the
+    ORB matches of both images
+
+    Returns:
+        np.ndarray | None: 2x3 matrix in full resolution pixels, None when
+        there are not enough consistent matches or the transform is not
+        plausible for a receipt
+    """
+    if (
+        reference_features["descriptors"] is None
+        or input_features["descriptors"] is None
+    ):
+        return None
+
+    matcher = cv2.BFMatcher(cv2.NORM_HAMMING, crossCheck=True)
+    matches = matcher.match(
+        reference_features["descriptors"], input_features["descriptors"]
+    )
+    if len(matches) < MIN_INLIERS:
+        return None
+
+    source = reference_features["points"][[match.queryIdx for match in matches]]
+    target = input_features["points"][[match.trainIdx for match in matches]]
+    matrix, inliers = cv2.estimateAffinePartial2D(
+        source, target, method=cv2.RANSAC, ransacReprojThreshold=3.0
+    )
+    if matrix is None:
+        return None
+
+    inlier_count = int(inliers.sum())
+    if inlier_count < MIN_INLIERS or inlier_count / len(matches) < MIN_INLIER_RATIO:
+        return None
+
+    scale = float(np.hypot(matrix[0, 0], matrix[1, 0]))
+    rotation = float(np.degrees(np.arctan2(matrix[1, 0], matrix[0, 0])))
+    if (
+        not 1 / MAX_SCALE_CHANGE <= scale <= MAX_SCALE_CHANGE
+        or abs(rotation) > MAX_ROTATION_DEGREES
+    ):
+        return None
+
+    # back to full resolution: input = S_in^-1 * M * S_ref * reference
+    full_matrix = matrix.astype(np.float64)
+    full_matrix[:, :2] *= reference_features["scale"] / input_features["scale"]
+    full_matrix[:, 2] /= input_features["scale"]
+    return full_matrix
+
+
+def align_boxes(boxes, matrix):
+    """
+    Map (x, y, width, height) boxes through a 2x3 transform, keeping the
+    axis-aligned bounding box of the four transformed corners
+
+    Returns:
+        np.ndarray: (N, 4) int array
+    """
+    boxes = np.asarray(boxes, dtype=np.float64).reshape(-1, 4)
+    x0, y0 = boxes[:, 0], boxes[:, 1]
+    x1, y1 = x0 + boxes[:, 2], y0 + boxes[:, 3]
+
+    corners = np.stack(
+        [
+            np.stack([x0, y0], axis=1),
+            np.stack([x1, y0], axis=1),
+            np.stack([x0, y1], axis=1),
+            np.stack([x1, y1], axis=1),
+        ],
+        axis=1,
+    )
+    mapped = corners @ matrix[:, :2].T + matrix[:, 2]
+
+    left_top = np.floor(mapped.min(axis=1))
+    right_bottom = np.ceil(mapped.max(axis=1))
+    return np.hstack([left_top, right_bottom - left_top]).astype(np.int64)
@@ -18,5 +18,62 @@ def get_args():
         default="classify_output",
         help="output path",
     )
+    parser.add_argument(
+        "-c",
+        "--concurrency",
+        required=False,
+        type=int,
+        default=8,
+        help="number of files processed at the same time",
+    )
+    parser.add_argument(
+        "--pdf-mask-mode",
+        required=False,
+        choices=["redact", "draw"],
+        default="redact",
+        help="redact removes the text and images under the masks of PDFs, draw only covers them with black rectangles",
+    )
+    parser.add_argument(
+        "--matcher",
+        required=False,
+        choices=["gemini", "local"],
+        default="gemini",
+        help="gemini compares the input with the templates using Gemini, local picks the template by structural similarity without any API call",
+    )
+    parser.add_argument(
+        "--alignment",
+        required=False,
+        choices=["orb", "scale"],
+        default="orb",
+        help="orb aligns the masks of images to the template reference with feature matching, falling back to scale; scale only stretches them to the input size",
+    )
+    parser.add_argument(
+        "--png-compression",
+        required=False,
+        type=int,
+        choices=range(0, 10),
+        default=3,
+        help="PNG compression level of masked images, 0-9 (default: 3)",
+    )
+    parser.add_argument(
+        "--jpeg-quality",
+        required=False,
+        type=int,
+        default=90,
+        help="JPEG quality of masked images, 0-100 (default: 90)",
+    )
+    parser.add_argument(
+        "--batch-size",
+        required=False,
+        type=int,
+        default=32,
+        help="maximum number of files masked together with the same template and size (default: 32)",
+    )
+    parser.add_argument(
+        "--no-resume",
+        required=False,
+        action="store_true",
+        help="mask every file again, ignoring the files recorded as masked in the run manifest of the output folder",
+    )
     args = parser.parse_args()
     return args
@@ -0,0 +1,151 @@
+import datetime
+import io
+import os
+import threading
+import time
+
+import google.generativeai as genai
+from dotenv import load_dotenv
+
+from src.utils.payload import payload_optimizer
+
+load_dotenv()
+
+FILES_TTL = datetime.timedelta(hours=48)
+EXPIRY_MARGIN = datetime.timedelta(hours=1)
+PROCESSING_TIMEOUT_SECONDS = 30
+PROCESSING_POLL_SECONDS = 1
+
+
+class InlineAssetStore:
+    """
+    Template references sent inline, as their payload bytes, with every
+    comparison. Used when uploads are off and as the stand-in of
+    GeminiFileAssetStore where the Files API is not available
+    """
+
+    def get_parts(self, file_path, file_data=None):
+        return payload_optimizer.get_payload(file_path, file_data)["parts"]
+
+    def invalidate(self, file_path, file_data=None):
+        pass
+
+    def release(self):
+        pass
+
+
+class GeminiFileAssetStore(InlineAssetStore):
+    """
+    Template references uploaded once to the Gemini Files API and referred
+    to by handle in every later comparison. Handles are kept in memory by
+    file hash and uploaded again when they are about to expire (files live
+    48 hours). When an upload fails, the inline payload is used instead
+    """
+
+    def __init__(self, expiry_margin=EXPIRY_MARGIN):
+        self.expiry_margin = expiry_margin
+        self._handles = {}
+        self._locks = {}
+        self._stale = []
+        self._lock = threading.Lock()
+        self.stats = {"uploads": 0, "reused": 0, "inline": 0}
+
+    def _key_lock(self, file_hash):
+        with self._lock:
+            return self._locks.setdefault(file_hash, threading.Lock())
+
+    def get_parts(self, file_path, file_data=None):
+        """
+        Returns:
+            list: uploaded files of the reference payload (one per page), or
+            its inline parts when they could not be uploaded
+        """
+        payload = payload_optimizer.get_payload(file_path, file_data)
+        file_hash = payload["file_hash"]
+
+        with self._key_lock(file_hash):
+            entry = self._handles.get(file_hash)
+            now = datetime.datetime.now(datetime.timezone.utc)
+            if entry and entry["expires_at"] - self.expiry_margin > now:
+                self.stats["reused"] += 1
+                return entry["files"]
+
+            try:
+                files = [
+                    self.upload(part, os.path.basename(file_path))
+                    for part in payload["parts"]
+                ]
+            except Exception as e:
+                print(
+                    f"sensitive_data_masker: ⚠️ could not upload {file_path}, sending it inline: {e}"
+                )
+                self.stats["inline"] += 1
+                return payload["parts"]
+
+            self._handles[file_hash] = {
+                "files": files,
+                "expires_at": min(
+                    file.expiration_time or now + FILES_TTL for file in files
+                ),
+            }
+            self.stats["uploads"] += 1
+            return files
+
+    def upload(self, part, display_name):
+        file = genai.upload_file(
+            io.BytesIO(part["data"]),
+            mime_type=part["mime_type"],
+            display_name=display_name,
+        )
+
+        deadline = time.monotonic() + PROCESSING_TIMEOUT_SECONDS
+        while file.state.name == "PROCESSING" and time.monotonic() < deadline:
+            time.sleep(PROCESSING_POLL_SECONDS)
+            file = genai.get_file(file.name)
+
+        if file.state.name != "ACTIVE":
+            raise ValueError(f"uploaded file {file.name} is {file.state.name}")
+        return file
+
+    def invalidate(self, file_path, file_data=None):
+        """
+        Drops the handles of a reference that Gemini no longer accepts, so the
+        next comparison uploads it again
+        """
+        file_hash = payload_optimizer.get_payload(file_path, file_data)["file_hash"]
+        with self._key_lock(file_hash):
+            entry = self._handles.pop(file_hash, None)
+        if entry:
+            with self._lock:
+                self._stale.append(entry)
+
+    def release(self):
+        """
+        Deletes the uploaded references at the end of a run
+        """
+        with self._lock:
+            handles = list(self._handles.values()) + self._stale
+            self._handles.clear()
+            self._stale = []
+
+        for entry in handles:
+            for file in entry["files"]:
+                try:
+                    genai.delete_file(file.name)
+                except Exception as e:
+                    print(
+                        f"sensitive_data_masker: ⚠️ could not delete uploaded {file.name}: {e}"
+                    )
+
+
+def create_template_asset_store(mode):
+    if mode == "files":
+        return GeminiFileAssetStore()
+    if mode == "inline":
+        return InlineAssetStore()
+    raise ValueError(f"unknown template asset mode: {mode}")
+
+
+template_asset_store = create_template_asset_store(
+    os.getenv("GEMINI_TEMPLATE_ASSETS", "files")
+)
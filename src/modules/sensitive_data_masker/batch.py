@@ -0,0 +1,149 @@
+import asyncio
+
+from src.modules.sensitive_data_masker.coordinates import scale_coordinates
+
+DEFAULT_BATCH_SIZE = 32
+DEFAULT_LINGER_SECONDS = 0.05
+
+
+def get_group_key(template, document):
+    """
+    Files masked with the same template and the same page sizes share their
+    scaled rectangles
+    """
+    page_sizes = tuple(
+        document.page_size(page_index) for page_index in range(document.page_count)
+    )
+    return (
+        template["bank_name"],
+        template["name"],
+        template["file_extension"],
+        document.is_pdf,
+        page_sizes,
+    )
+
+
+def scale_template_boxes(template, document):
+    """
+    Template rectangles of every page scaled to the page sizes of document
+
+    Returns:
+        dict: {page_index: (N, 4) int array}, pages without coordinates in
+        the template are left out
+    """
+    pages_boxes = {}
+    for page_index in range(document.page_count):
+        boxes = template["page_boxes"].get(page_index)
+        if boxes is None:
+            continue
+
+        input_width, input_height = document.page_size(page_index)
+        ref_width, ref_height = template["page_sizes"].get(
+            page_index, template["page_sizes"][0]
+        )
+
+        if input_width != ref_width or input_height != ref_height:
+            boxes = scale_coordinates(
+                boxes, ref_width, ref_height, input_width, input_height
+            )
+        pages_boxes[page_index] = boxes
+
+    return pages_boxes
+
+
+class MaskBatcher:
+    """
+    Collects the matched files of concurrent workers and masks them per
+    (template, page sizes) group: the rectangles are scaled once per group
+    and every file of the group is then masked in the executor with them.
+    A group is flushed when it reaches batch_size files or linger_seconds
+    after its first file arrived, so a lone file is never held for long
+    """
+
+    def __init__(
+        self,
+        mask_function,
+        executor=None,
+        page_executor=None,
+        options=None,
+        batch_size=DEFAULT_BATCH_SIZE,
+        linger_seconds=DEFAULT_LINGER_SECONDS,
+    ):
+        self.mask_function = mask_function
+        self.executor = executor
+        self.page_executor = page_executor
+        self.options = options
+        self.batch_size = max(1, batch_size)
+        self.linger_seconds = linger_seconds
+        self.groups = {}
+        self.timers = {}
+        self.stats = {"files": 0, "groups": 0}
+
+    async def mask(self, document, template, output_path):
+        """
+        Queue the file in its group and wait until the group is masked
+
+        Returns:
+            dict: result of mask_function for this file
+        """
+        loop = asyncio.get_running_loop()
+        key = get_group_key(template, document)
+        future = loop.create_future()
+
+        group = self.groups.setdefault(key, [])
+        group.append((document, template, output_path, future))
+
+        if len(group) >= self.batch_size:
+            self.flush(key)
+        elif len(group) == 1:
+            self.timers[key] = loop.call_later(self.linger_seconds, self.flush, key)
+
+        return await future
+
+    def flush(self, key):
+        timer = self.timers.pop(key, None)
+        if timer is not None:
+            timer.cancel()
+
+        group = self.groups.pop(key, None)
+        if not group:
+            return
+
+        loop = asyncio.get_running_loop()
+        document, template, _, _ = group[0]
+        try:
+            pages_boxes = scale_template_boxes(template, document)
+        except Exception as e:
+            for _, _, _, future in group:
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        self.stats["files"] += len(group)
+        self.stats["groups"] += 1
+
+        for document, template, output_path, future in group:
+            if future.done():
+                continue
+            task = loop.run_in_executor(
+                self.executor,
+                self.mask_function,
+                document,
+                template,
+                pages_boxes,
+                output_path,
+                self.page_executor,
+                self.options,
+            )
+            task.add_done_callback(lambda task, future=future: resolve(future, task))
+
+
+def resolve(future, task):
+    if future.done():
+        return
+    if task.cancelled():
+        future.cancel()
+    elif task.exception() is not None:
+        future.set_exception(task.exception())
+    else:
+        future.set_result(task.result())
@@ -1,18 +1,42 @@
-def scale_coordinates(
-    coordinates, source_width, source_height, target_width, target_height
-):
+import numpy as np
+
+
+def to_boxes(coordinates):
+    """
+    Template coordinates as an (N, 4) int array of x, y, width, height rows
+    """
+    return np.array(
+        [
+            [coord["x"], coord["y"], coord["width"], coord["height"]]
+            for coord in coordinates
+        ],
+        dtype=np.int64,
+    ).reshape(-1, 4)
+
+
+def scale_coordinates(boxes, source_width, source_height, target_width, target_height):
+    """
+    Scale an (N, 4) box array in a single operation, truncating to whole
+    pixels like the previous per rectangle int() conversion
+    """
     scale_x = target_width / source_width
     scale_y = target_height / source_height
+    scale = np.array([scale_x, scale_y, scale_x, scale_y])
+    return (boxes * scale).astype(np.int64)
+
+
+def normalize_page_coordinates(data):
+    """
+    Template coordinates keyed by page index. The JSON may be a plain list
+    (single page templates) or an object keyed by page index, e.g.
+    {"0": [...], "1": [...]}
+    """
+    if isinstance(data, list):
+        return {0: data}
+    return {int(page_index): coords for page_index, coords in data.items()}
+
 
-    scaled_coords = []
-    for coord in coordinates:
-        scaled_coords.append(
-            {
-                "x": int(coord["x"] * scale_x),
-                "y": int(coord["y"] * scale_y),
-                "width": int(coord["width"] * scale_x),
-                "height": int(coord["height"] * scale_y),
-            }
-        )
-
-    return scaled_coords
+def serialize_page_coordinates(pages):
+    if set(pages) <= {0}:
+        return pages.get(0, [])
+    return {str(page_index): pages[page_index] for page_index in sorted(pages)}
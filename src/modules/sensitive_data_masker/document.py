@@ -0,0 +1,77 @@
+import os
+
+import cv2
+import fitz
+import numpy as np
+
+from src.modules.sensitive_data_masker.registry import (
+    PDF_EXTENSION,
+    PDF_RENDER_ZOOM,
+    get_page_render_size,
+)
+from src.utils.fitz_lock import fitz_lock
+
+
+class InputDocument:
+    """
+    Input file decoded once and shared by matching and masking. For PDFs the
+    page is kept open, the size of every page in template pixels is read
+    from page.rect when the file is opened (so page_size never takes the
+    fitz lock on the event loop) and the pixmap is only rendered when the
+    image is actually needed
+    """
+
+    def __init__(self, file_path):
+        self.file_path = file_path
+        self.is_pdf = os.path.splitext(file_path)[1].lower() == PDF_EXTENSION
+        self.doc = None
+        self.page = None
+        self._image = None
+
+        if self.is_pdf:
+            with fitz_lock:
+                self.doc = fitz.open(file_path)
+                self.page = self.doc[0]
+                self.page_count = self.doc.page_count
+                self.page_sizes = [get_page_render_size(page) for page in self.doc]
+            self.width, self.height = self.page_sizes[0]
+        else:
+            self._image = cv2.imread(file_path)
+            if self._image is None:
+                raise ValueError(f"could not load image: {file_path}")
+            self.height, self.width = self._image.shape[:2]
+            self.page_count = 1
+            self.page_sizes = [(self.width, self.height)]
+
+    @property
+    def image(self):
+        if self._image is None:
+            with fitz_lock:
+                pix = self.page.get_pixmap(
+                    matrix=fitz.Matrix(PDF_RENDER_ZOOM, PDF_RENDER_ZOOM)
+                )
+            img_data = np.frombuffer(pix.samples, dtype=np.uint8).reshape(
+                pix.height, pix.width, pix.n
+            )
+            if pix.n == 4:
+                self._image = cv2.cvtColor(img_data, cv2.COLOR_RGBA2BGR)
+            else:
+                self._image = cv2.cvtColor(img_data, cv2.COLOR_RGB2BGR)
+        return self._image
+
+    def page_size(self, page_index):
+        return self.page_sizes[page_index]
+
+    def close(self):
+        if self.doc is not None:
+            with fitz_lock:
+                self.doc.close()
+            self.doc = None
+            self.page = None
+
+
+def open_input_document(file_path):
+    try:
+        return InputDocument(file_path)
+    except Exception:
+        return None
@@ -1,16 +1,93 @@
+import asyncio
+import json
+import multiprocessing
 import os
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
 
-import cv2
+import numpy as np
 
+from src.modules.sensitive_data_masker.assets import template_asset_store
+from src.modules.sensitive_data_masker.document import open_input_document
+from src.modules.sensitive_data_masker.fingerprint import compute_fingerprint
+from src.modules.sensitive_data_masker.local_matcher import find_best_template_locally
+from src.modules.sensitive_data_masker.manifest import (
+    RunManifest,
+    get_template_label,
+    hash_file,
+)
 from src.modules.sensitive_data_masker.matcher import find_best_template
-from src.modules.sensitive_data_masker.coordinates import scale_coordinates
+from src.modules.sensitive_data_masker.registry import template_registry
+from src.modules.sensitive_data_masker.verify import verify_mask_coverage
+from src.modules.sensitive_data_masker.align import (
+    align_boxes,
+    compute_alignment_features,
+    estimate_alignment,
+)
+from src.modules.sensitive_data_masker.batch import (
+    DEFAULT_BATCH_SIZE,
+    MaskBatcher,
+    scale_template_boxes,
+)
 from src.modules.sensitive_data_masker.masking import (
+    DEFAULT_JPEG_QUALITY,
+    DEFAULT_PNG_COMPRESSION,
     apply_mask_to_image,
     apply_mask_to_pdf,
 )
+from src.utils.verdict_cache import hash_bytes
+
+
+DEFAULT_CONCURRENCY = 8
+ALIGNMENT_TOLERANCE = 2
+DEFAULT_MASKING_OPTIONS = {
+    "pdf_mask_mode": "redact",
+    "matcher": "gemini",
+    "alignment": "orb",
+    "png_compression": DEFAULT_PNG_COMPRESSION,
+    "jpeg_quality": DEFAULT_JPEG_QUALITY,
+    "batch_size": DEFAULT_BATCH_SIZE,
+    "resume": True,
+}
+
+
+# Options that only change how a run is executed, not its outputs
+EXECUTION_OPTIONS = {"batch_size", "resume"}
+
+
+def get_masking_options(options=None):
+    return {**DEFAULT_MASKING_OPTIONS, **(options or {})}
+
 
+def get_options_key(options):
+    """
+    Hash of the options that change the masked outputs, part of every
+    manifest record
+    """
+    output_options = {
+        name: value for name, value in options.items() if name not in EXECUTION_OPTIONS
+    }
+    return hash_bytes(json.dumps(output_options, sort_keys=True).encode())
 
-async def process_files_with_coordinate_matching(input_path: str, output_dir: str):
+
+async def process_files_with_coordinate_matching(
+    input_path: str,
+    output_dir: str,
+    concurrency: int = DEFAULT_CONCURRENCY,
+    options: dict = None,
+):
+    """
+    Mask every receipt of input_path into output_dir. Each processed file is
+    recorded in the run manifest of output_dir, and files already masked by
+    a previous run are skipped unless the 'resume' option is off
+
+    Returns:
+        dict: masking result of each processed file, keyed by input path
+        (None when it was not masked)
+    """
+    options = get_masking_options(options)
+    manifest = RunManifest(output_dir, options["resume"], get_options_key(options))
+    results = {}
+    queue = asyncio.Queue()
     for root, _, files in os.walk(input_path):
         for file in files:
             _, ext = os.path.splitext(file)
@@ -22,98 +99,437 @@ async def process_files_with_coordinate_matching(input_path: str, output_dir: st
             ]:
                 continue
 
-            file_path = os.path.join(root, file)
-            process_file(file_path, input_path, output_dir)
+            queue.put_nowait(os.path.join(root, file))
+
+    print(
+        f"sensitive_data_masker: {queue.qsize()} file(s) to process with concurrency {concurrency}"
+    )
+
+    with (
+        ThreadPoolExecutor(max_workers=os.cpu_count()) as executor,
+        create_page_executor() as page_executor,
+    ):
+        batcher = create_mask_batcher(executor, page_executor, options)
+        workers = [
+            asyncio.create_task(
+                mask_worker(
+                    queue,
+                    input_path,
+                    output_dir,
+                    executor,
+                    page_executor,
+                    options,
+                    results,
+                    batcher,
+                    manifest,
+                )
+            )
+            for _ in range(max(1, concurrency))
+        ]
+        try:
+            await asyncio.gather(*workers)
+        finally:
+            await asyncio.to_thread(template_asset_store.release)
+
+    masked = [
+        result for result in results.values() if result and not result.get("resumed")
+    ]
+    aligned = sum(1 for result in masked if result.get("aligned"))
+    resumed = sum(1 for result in results.values() if result and result.get("resumed"))
+    print(
+        f"sensitive_data_masker: {len(masked)} of {len(results) - resumed} file(s) masked ({aligned} aligned one by one), {batcher.stats['groups']} template group(s) masked in batch, {resumed} already masked by a previous run"
+    )
+    return results
+
+
+def create_mask_batcher(executor, page_executor, options=None):
+    options = get_masking_options(options)
+    return MaskBatcher(
+        mask_with_boxes,
+        executor,
+        page_executor,
+        options,
+        batch_size=options["batch_size"],
+    )
+
 
+def create_page_executor():
+    """
+    Process pool for the pages of multi-page PDFs. Workers are spawned, not
+    forked, since the parent process runs threads and an event loop
+    """
+    return ProcessPoolExecutor(
+        max_workers=os.cpu_count(), mp_context=multiprocessing.get_context("spawn")
+    )
 
-def process_file(file_path, base_input_path, output_dir):
+
+async def mask_worker(
+    queue,
+    base_input_path,
+    output_dir,
+    executor,
+    page_executor,
+    options,
+    results,
+    batcher=None,
+    manifest=None,
+):
+    while True:
+        try:
+            file_path = queue.get_nowait()
+        except asyncio.QueueEmpty:
+            return
+
+        results[file_path] = await process_file(
+            file_path,
+            base_input_path,
+            output_dir,
+            executor,
+            page_executor,
+            options,
+            batcher,
+            manifest,
+        )
+
+
+async def process_file(
+    file_path,
+    base_input_path,
+    output_dir,
+    executor=None,
+    page_executor=None,
+    options=None,
+    batcher=None,
+    manifest=None,
+):
     person_name, bank_name = extract_path_info(file_path, base_input_path)
 
     if not person_name or not bank_name:
         print(f"sensitive_data_masker: invalid path structure: '{file_path}' ⚠️")
-        return
+        return None
 
-    try:
-        print(f"sensitive_data_masker: '{file_path}' [{bank_name}] processing...")
-        match = find_best_template(file_path, bank_name)
+    rel_path = os.path.relpath(file_path, base_input_path)
+    output_path = os.path.join(output_dir, rel_path)
 
-        if not match:
-            print(
-                f"sensitive_data_masker: '{file_path}' [{bank_name}] no match found ⚠️"
-            )
-            return
+    if manifest is None:
+        return await mask_single_file(
+            file_path, bank_name, output_path, executor, page_executor, options, batcher
+        )
 
-        template = match["template"]
-        coordinates = template["coordinates"]
+    loop = asyncio.get_running_loop()
+    input_hash = await loop.run_in_executor(executor, hash_file, file_path)
+    try:
+        templates = await loop.run_in_executor(
+            executor,
+            template_registry.get_templates,
+            bank_name,
+            os.path.splitext(file_path)[1].lower(),
+        )
+    except FileNotFoundError:
+        templates = []
+    record = manifest.get_done(
+        rel_path,
+        input_hash,
+        {
+            get_template_label(template): template["template_key"]
+            for template in templates
+        },
+    )
+    if record:
+        print(
+            f"sensitive_data_masker: '{file_path}' [{bank_name}] already masked by a previous run with template [{record['template']}], skipped ⏭️"
+        )
+        return {
+            "output_path": record["output_path"],
+            "template": None,
+            "confidence": record["confidence"],
+            "verified": record["verified"],
+            "coverage": None,
+            "resumed": True,
+        }
 
-        _, ext = os.path.splitext(file_path)
-        ext_lower = ext.lower()
+    result = await mask_single_file(
+        file_path, bank_name, output_path, executor, page_executor, options, batcher
+    )
+    manifest.record(rel_path, input_hash, output_path, result)
+    return result
 
-        if ext_lower == ".pdf":
-            import fitz
 
-            doc = fitz.open(file_path)
-            page = doc[0]
-            pix = page.get_pixmap(matrix=fitz.Matrix(2, 2))
-            import numpy as np
+async def mask_single_file(
+    file_path,
+    bank_name,
+    output_path,
+    executor=None,
+    page_executor=None,
+    options=None,
+    batcher=None,
+):
+    """
+    Match the file against the templates of its bank (with Gemini, or by
+    structural similarity with the 'local' matcher option) and write the
+    masked output to output_path
 
-            img_data = np.frombuffer(pix.samples, dtype=np.uint8).reshape(
-                pix.height, pix.width, pix.n
-            )
-            if pix.n == 4:
-                input_image = cv2.cvtColor(img_data, cv2.COLOR_RGBA2BGR)
-            else:
-                input_image = cv2.cvtColor(img_data, cv2.COLOR_RGB2BGR)
-            doc.close()
-        else:
-            input_image = cv2.imread(file_path)
+    Returns:
+        dict | None: {'output_path', 'template', 'confidence', 'verified',
+        'coverage', 'aligned'} when the file was masked, verified meaning the
+        redaction was checked locally and the file does not need the Gemini
+        guardrail, coverage holding the pixel check of the masks and aligned
+        whether the masks were aligned to the reference instead of scaled
+    """
+    options = get_masking_options(options)
+    try:
+        print(f"sensitive_data_masker: '{file_path}' [{bank_name}] processing...")
+        loop = asyncio.get_running_loop()
+        _, ext = os.path.splitext(file_path)
+        templates = await loop.run_in_executor(
+            executor, template_registry.get_templates, bank_name, ext
+        )
+        document = await loop.run_in_executor(executor, open_input_document, file_path)
 
-        if input_image is None:
+        if document is None:
             print(
                 f"sensitive_data_masker: '{file_path}' [{bank_name}] could not load file ⚠️"
             )
-            return
-
-        input_height, input_width = input_image.shape[:2]
+            return None
 
-        if template["reference_image"] is not None:
-            ref_image = template["reference_image"]
-            ref_height, ref_width = ref_image.shape[:2]
-        else:
-            ref_height, ref_width = input_height, input_width
+        try:
+            if options["matcher"] == "local":
+                match = await loop.run_in_executor(
+                    executor, match_document_locally, document, templates
+                )
+            else:
+                input_fingerprint = await loop.run_in_executor(
+                    executor, compute_document_fingerprint, document
+                )
+                match = await find_best_template(
+                    file_path,
+                    bank_name,
+                    templates=templates,
+                    input_fingerprint=input_fingerprint,
+                )
 
-        if input_width != ref_width or input_height != ref_height:
-            coordinates = scale_coordinates(
-                coordinates, ref_width, ref_height, input_width, input_height
-            )
+            if not match:
+                print(
+                    f"sensitive_data_masker: '{file_path}' [{bank_name}] no match found ⚠️"
+                )
+                return None
 
-        rel_path = os.path.relpath(file_path, base_input_path)
-        output_path = os.path.join(output_dir, rel_path)
-        os.makedirs(os.path.dirname(output_path), exist_ok=True)
+            template = match["template"]
 
-        _, ext = os.path.splitext(file_path)
-        ext_lower = ext.lower()
+            aligned_boxes = None
+            if (
+                options["alignment"] == "orb"
+                and template["reference_image"] is not None
+            ):
+                aligned_boxes = await loop.run_in_executor(
+                    executor, align_template_boxes, template, document
+                )
 
-        success = False
-        if ext_lower in [".jpg", ".jpeg", ".png"]:
-            success = apply_mask_to_image(file_path, coordinates, output_path)
-        elif ext_lower == ".pdf":
-            success = apply_mask_to_pdf(file_path, coordinates, output_path)
+            if aligned_boxes is not None:
+                result = await loop.run_in_executor(
+                    executor,
+                    mask_with_boxes,
+                    document,
+                    template,
+                    aligned_boxes,
+                    output_path,
+                    page_executor,
+                    options,
+                )
+            elif batcher is not None:
+                result = await batcher.mask(document, template, output_path)
+            else:
+                result = await loop.run_in_executor(
+                    executor,
+                    mask_file,
+                    document,
+                    template,
+                    output_path,
+                    page_executor,
+                    options,
+                )
+        finally:
+            document.close()
 
-        if success:
+        coverage = result["coverage"]
+        if result["masked"] and not coverage["passed"]:
             print(
-                f"sensitive_data_masker: '{file_path}' [{bank_name}] masked with template [{template['bank_name']}/{template['name']}.{template['file_extension']}], confidence: {match['confidence']:.2f} ✅"
+                f"sensitive_data_masker: '{file_path}' [{bank_name}] masks not fully black in the output ({coverage['uncovered_rects']}/{coverage['rects']} rect(s) uncovered, {coverage['out_of_bounds_rects']} out of bounds), output removed ❌"
             )
-            return
-        else:
+            return None
+
+        if not result["masked"]:
             print(
                 f"sensitive_data_masker: '{file_path}' [{bank_name}] masked failed ❌"
             )
-            return
+            return None
+
+        if coverage["out_of_bounds_rects"]:
+            print(
+                f"sensitive_data_masker: '{file_path}' [{bank_name}] {coverage['out_of_bounds_rects']} mask(s) partially outside the page after scaling ⚠️"
+            )
+
+        verification = ""
+        if aligned_boxes is not None:
+            verification += ", masks aligned to the reference"
+        if result["leaked_chars"]:
+            verification += (
+                f", {result['leaked_chars']} char(s) of text still under the masks ⚠️"
+            )
+        elif result["verified"]:
+            verification += ", redaction verified locally"
+
+        print(
+            f"sensitive_data_masker: '{file_path}' [{bank_name}] masked with template [{template['bank_name']}/{template['name']}.{template['file_extension']}], confidence: {match['confidence']:.2f}, mask coverage: {coverage['min_coverage']:.2f}{verification} ✅"
+        )
+        return {
+            "output_path": output_path,
+            "template": template,
+            "confidence": match["confidence"],
+            "verified": result["verified"],
+            "coverage": coverage,
+            "aligned": aligned_boxes is not None,
+        }
 
     except Exception as e:
         print(f"sensitive_data_masker: error processing '{file_path}': {e}")
-        return
+        return None
+
+
+def align_template_boxes(template, document):
+    """
+    Template rectangles mapped to the input image through the transform
+    estimated between the reference image and the input, for screenshots
+    that are shifted or cropped instead of uniformly stretched
+
+    Returns:
+        dict | None: {0: (N, 4) int array}, None when the alignment failed
+        or agrees with plain scaling, so the file goes through the batched
+        path with the scaled rectangles
+    """
+    boxes = template["page_boxes"].get(0)
+    if boxes is None or not len(boxes) or template["alignment_features"] is None:
+        return None
+
+    matrix = estimate_alignment(
+        template["alignment_features"],
+        compute_alignment_features(document.image),
+    )
+    if matrix is None:
+        return None
+
+    aligned = align_boxes(boxes, matrix)
+    scaled = scale_template_boxes(template, document)[0]
+    if np.abs(aligned - scaled).max() <= ALIGNMENT_TOLERANCE:
+        return None
+    return {0: aligned}
+
+
+def compute_document_fingerprint(document):
+    return compute_fingerprint(document.image)
+
+
+def match_document_locally(document, templates):
+    return find_best_template_locally(document.image, templates)
+
+
+def mask_file(document, template, output_path, page_executor=None, options=None):
+    """
+    CPU-bound part of the masking of a single file: scale the template
+    rectangles of each page to the decoded input and write the masked output
+
+    Returns:
+        dict: {'masked': bool, 'verified': bool, 'leaked_chars': int | None}
+    """
+    pages_boxes = scale_template_boxes(template, document)
+    return mask_with_boxes(
+        document, template, pages_boxes, output_path, page_executor, options
+    )
+
+
+def mask_with_boxes(
+    document, template, pages_boxes, output_path, page_executor=None, options=None
+):
+    """
+    Write the masked output with rectangles already scaled to the input, as
+    computed once per group by the MaskBatcher, then reload it and check the
+    masks pixel by pixel. An output failing that check is removed, and no
+    output is written when a page has no coordinates in the template
+
+    Returns:
+        dict: {'masked': bool, 'verified': bool, 'leaked_chars': int | None,
+        'coverage': dict | None}
+    """
+    options = get_masking_options(options)
+    missing_pages = [
+        page_index
+        for page_index in range(document.page_count)
+        if page_index not in pages_boxes
+    ]
+    if missing_pages:
+        print(
+            f"sensitive_data_masker: '{document.file_path}' page(s) {', '.join(str(page_index + 1) for page_index in missing_pages)} have no coordinates in template [{template['bank_name']}/{template['name']}], not masked ❌"
+        )
+        if os.path.exists(output_path):
+            os.remove(output_path)
+        return {
+            "masked": False,
+            "verified": False,
+            "leaked_chars": None,
+            "coverage": None,
+        }
+
+    os.makedirs(os.path.dirname(output_path), exist_ok=True)
+
+    if document.is_pdf:
+        redact = options["pdf_mask_mode"] == "redact"
+        result = apply_mask_to_pdf(
+            document, pages_boxes, output_path, page_executor, redact
+        )
+        coverage = check_coverage(result["masked"], output_path, pages_boxes)
+        verified = (
+            redact
+            and result["masked"]
+            and coverage["passed"]
+            and result["leaked_chars"] == 0
+        )
+        return {**result, "verified": verified, "coverage": coverage}
+
+    masked = apply_mask_to_image(
+        document.image,
+        pages_boxes.get(0, np.empty((0, 4), dtype=np.int64)),
+        output_path,
+        options["png_compression"],
+        options["jpeg_quality"],
+    )
+    coverage = check_coverage(masked, output_path, pages_boxes)
+    return {
+        "masked": masked,
+        "verified": False,
+        "leaked_chars": None,
+        "coverage": coverage,
+    }
+
+
+def check_coverage(masked, output_path, pages_boxes):
+    if not masked:
+        return None
+
+    try:
+        coverage = verify_mask_coverage(output_path, pages_boxes)
+    except Exception as e:
+        print(f"❌ Error verifying masks of {output_path}: {e}")
+        coverage = {
+            "passed": False,
+            "rects": 0,
+            "uncovered_rects": 0,
+            "out_of_bounds_rects": 0,
+            "min_coverage": 0.0,
+        }
+
+    if not coverage["passed"] and os.path.exists(output_path):
+        os.remove(output_path)
+    return coverage
 
 
 def extract_path_info(file_path, base_path):
@@ -0,0 +1,213 @@
+import os
+import threading
+
+import numpy as np
+
+from src.modules.sensitive_data_masker.align import compute_alignment_features
+from src.modules.sensitive_data_masker.coordinates import to_boxes
+from src.modules.sensitive_data_masker.fingerprint import compute_fingerprint
+from src.modules.sensitive_data_masker.local_matcher import (
+    compute_template_thumbnail,
+    thumbnail_from_pixels,
+)
+from src.utils.verdict_cache import build_cache_key
+
+FEATURE_INDEX_FILENAME = "template_features.npz"
+FEATURE_INDEX_VERSION = "1"
+PATHS_FIELD = "__paths__"
+KEYS_FIELD = "__keys__"
+
+
+def build_feature_key(reference_bytes, coordinates_bytes):
+    """
+    Content hash of a template: its reference file, its coordinates and the
+    feature version, so editing any of them makes the entry stale
+    """
+    return build_cache_key(
+        "template-features", FEATURE_INDEX_VERSION, reference_bytes, coordinates_bytes
+    )
+
+
+def compute_template_features(image, coordinates, reference_size, with_alignment):
+    """
+    Matching features of a template reference (PDF references are passed as
+    their rendered preview), as flat arrays ready to be stored in the index
+
+    Returns:
+        dict: {field: np.ndarray}
+    """
+    boxes = to_boxes(coordinates)
+
+    fingerprint = compute_fingerprint(image, coordinates, reference_size)
+    thumbnail = compute_template_thumbnail(image, boxes, reference_size)
+
+    features = {
+        "fingerprint_edges": fingerprint["edges"],
+        "fingerprint_valid": fingerprint["valid"],
+        "fingerprint_aspect_ratio": np.float64(fingerprint["aspect_ratio"]),
+        "thumbnail_pixels": thumbnail["pixels"].astype(np.uint8),
+        "thumbnail_valid": thumbnail["valid"],
+        "thumbnail_aspect_ratio": np.float64(thumbnail["aspect_ratio"]),
+    }
+
+    if with_alignment:
+        alignment = compute_alignment_features(image, boxes)
+        descriptors = alignment["descriptors"]
+        if descriptors is None:
+            descriptors = np.empty((0, 32), dtype=np.uint8)
+        features["alignment_points"] = alignment["points"]
+        features["alignment_descriptors"] = descriptors
+        features["alignment_scale"] = np.float64(alignment["scale"])
+
+    return features
+
+
+def to_template_fields(features):
+    """
+    Returns:
+        dict: the 'fingerprint', 'thumbnail' and 'alignment_features' entries
+        of a template, built from the flat arrays of the index
+    """
+    fields = {
+        "fingerprint": {
+            "edges": features["fingerprint_edges"],
+            "valid": features["fingerprint_valid"],
+            "aspect_ratio": float(features["fingerprint_aspect_ratio"]),
+        },
+        "thumbnail": {
+            **thumbnail_from_pixels(
+                features["thumbnail_pixels"],
+                float(features["thumbnail_aspect_ratio"]),
+            ),
+            "valid": features["thumbnail_valid"],
+        },
+        "alignment_features": None,
+    }
+
+    if "alignment_points" in features:
+        descriptors = features["alignment_descriptors"]
+        fields["alignment_features"] = {
+            "points": features["alignment_points"],
+            "descriptors": descriptors if len(descriptors) else None,
+            "scale": float(features["alignment_scale"]),
+        }
+    return fields
+
+
+class FeatureIndex:
+    """
+    Per-template matching features persisted in one .npz next to the
+    templates, keyed by content hash. The archive is opened lazily
+    and each entry is only read when its template is loaded; entries whose
+    hash no longer matches the template files are rebuilt and the archive
+    is rewritten once the bank is loaded
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        self._archive = None
+        self._loaded = False
+        self._paths = {}
+        self._entries = {}
+        self._dirty = False
+
+    def get(self, template_id, key):
+        with self._lock:
+            self._load()
+            if self._paths.get(template_id) != key:
+                return None
+
+            entry = self._entries.get(key)
+            if entry is None and self._archive is not None:
+                entry = self._read_entry(key)
+                if entry:
+                    self._entries[key] = entry
+            return entry or None
+
+    def put(self, template_id, key, features):
+        with self._lock:
+            self._load()
+            self._paths[template_id] = key
+            self._entries[key] = features
+            self._dirty = True
+
+    def save(self):
+        """
+        Rewrite the archive when entries were added or their template files
+        were removed from the coordinates directory
+        """
+        with self._lock:
+            self._load()
+            coordinates_dir = os.path.dirname(self.path)
+            removed = [
+                template_id
+                for template_id in self._paths
+                if not os.path.exists(os.path.join(coordinates_dir, template_id))
+            ]
+            for template_id in removed:
+                del self._paths[template_id]
+            self._dirty = self._dirty or bool(removed)
+
+            if not self._dirty:
+                return
+
+            arrays = {
+                PATHS_FIELD: np.array(list(self._paths), dtype=str),
+                KEYS_FIELD: np.array(list(self._paths.values()), dtype=str),
+            }
+            for key in set(self._paths.values()):
+                entry = self._entries.get(key)
+                if entry is None and self._archive is not None:
+                    entry = self._read_entry(key)
+                for field, value in (entry or {}).items():
+                    arrays[f"{key}/{field}"] = value
+
+            if self._archive is not None:
+                self._archive.close()
+                self._archive = None
+
+            temp_path = f"{self.path}.tmp.npz"
+            np.savez_compressed(temp_path, **arrays)
+            os.replace(temp_path, self.path)
+            self._archive = np.load(self.path, allow_pickle=False)
+            self._dirty = False
+
+    def _load(self):
+        if self._loaded:
+            return
+        self._loaded = True
+        if not os.path.exists(self.path):
+            return
+
+        try:
+            archive = np.load(self.path, allow_pickle=False)
+            self._paths = dict(
+                zip(archive[PATHS_FIELD].tolist(), archive[KEYS_FIELD].tolist())
+            )
+            self._archive = archive
+        except Exception as e:
+            print(
+                f"sensitive_data_masker: could not read feature index {self.path}, rebuilding it: {e} ⚠️"
+            )
+            self._paths = {}
+
+    def _read_entry(self, key):
+        prefix = f"{key}/"
+        return {
+            name[len(prefix) :]: self._archive[name]
+            for name in self._archive.files
+            if name.startswith(prefix)
+        }
+
+
+_indexes = {}
+_indexes_lock = threading.Lock()
+
+
+def get_feature_index(coordinates_dir):
+    path = os.path.join(coordinates_dir, FEATURE_INDEX_FILENAME)
+    with _indexes_lock:
+        if path not in _indexes:
+            _indexes[path] = FeatureIndex(path)
+        return _indexes[path]
@@ -0,0 +1,113 @@
+import cv2
+import numpy as np
+
+FINGERPRINT_SIZE = (64, 128)
+EDGE_WORKING_SIZE = (256, 512)
+PREFILTER_TOP_K = 2
+UNAMBIGUOUS_SCORE = 0.9
+UNAMBIGUOUS_MARGIN = 0.15
+
+
+def compute_fingerprint(image, coordinates=None, coordinates_size=None):
+    """
+    Layout fingerprint of a receipt: a downscaled edge map plus the image
+    aspect ratio. For references, the masked rectangles are excluded from the
+    comparison, since the black bars there replace whatever the input shows.
+    coordinates_size is the (width, height) the coordinates were drawn at,
+    when it differs from the image size
+
+    Returns:
+        dict: {'edges': ndarray, 'valid': ndarray, 'aspect_ratio': float}
+    """
+    if image.ndim == 3:
+        gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+    else:
+        gray = image
+
+    height, width = gray.shape[:2]
+    working = cv2.resize(gray, EDGE_WORKING_SIZE, interpolation=cv2.INTER_AREA)
+    edges = cv2.Canny(working, 50, 150)
+    edges = cv2.resize(edges, FINGERPRINT_SIZE, interpolation=cv2.INTER_AREA)
+    edges = edges.astype(np.float32) / 255.0
+
+    valid = np.ones(edges.shape, dtype=bool)
+    if coordinates:
+        source_width, source_height = coordinates_size or (width, height)
+        scale_x = FINGERPRINT_SIZE[0] / source_width
+        scale_y = FINGERPRINT_SIZE[1] / source_height
+        for coord in coordinates:
+            x0 = max(int(np.floor(coord["x"] * scale_x)) - 1, 0)
+            y0 = max(int(np.floor(coord["y"] * scale_y)) - 1, 0)
+            x1 = int(np.ceil((coord["x"] + coord["width"]) * scale_x)) + 1
+            y1 = int(np.ceil((coord["y"] + coord["height"]) * scale_y)) + 1
+            valid[y0:y1, x0:x1] = False
+
+    return {"edges": edges, "valid": valid, "aspect_ratio": width / height}
+
+
+def layout_similarity(input_fingerprint, reference_fingerprint):
+    """
+    Correlation of the edge maps over the unmasked area of the reference,
+    penalized by the aspect ratio difference. 1.0 means identical layout
+    """
+    valid = reference_fingerprint["valid"]
+    if not valid.any():
+        return 0.0
+
+    a = input_fingerprint["edges"][valid]
+    b = reference_fingerprint["edges"][valid]
+    a = a - a.mean()
+    b = b - b.mean()
+    norm = np.linalg.norm(a) * np.linalg.norm(b)
+    if norm == 0:
+        return 0.0
+
+    correlation = max(float(np.dot(a, b) / norm), 0.0)
+
+    ratios = (input_fingerprint["aspect_ratio"], reference_fingerprint["aspect_ratio"])
+    aspect_factor = min(ratios) / max(ratios)
+
+    return correlation * aspect_factor
+
+
+def prefilter_templates(
+    input_fingerprint,
+    templates,
+    top_k=PREFILTER_TOP_K,
+    unambiguous_score=UNAMBIGUOUS_SCORE,
+    unambiguous_margin=UNAMBIGUOUS_MARGIN,
+):
+    """
+    Rank the templates by layout similarity and keep the top_k. Templates
+    without fingerprint are always kept, since they cannot be ranked
+
+    Returns:
+        tuple: (candidates to compare with Gemini, local match or None when
+        the best template is not an unambiguous match)
+    """
+    ranked = []
+    unranked = []
+    for template in templates:
+        if template.get("fingerprint") is None:
+            unranked.append(template)
+            continue
+        score = layout_similarity(input_fingerprint, template["fingerprint"])
+        ranked.append((score, template))
+
+    ranked.sort(key=lambda item: item[0], reverse=True)
+
+    if ranked and not unranked:
+        best_score, best_template = ranked[0]
+        second_score = ranked[1][0] if len(ranked) > 1 else 0.0
+        if (
+            best_score >= unambiguous_score
+            and best_score - second_score >= unambiguous_margin
+        ):
+            return [], {
+                "template": best_template,
+                "confidence": best_score,
+                "reason": f"local layout fingerprint (similarity {best_score:.2f}, next {second_score:.2f})",
+            }
+
+    candidates = [template for _, template in ranked[:top_k]] + unranked
+    return candidates, None
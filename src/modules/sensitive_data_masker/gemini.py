@@ -1,25 +1,33 @@
+import asyncio
 import json
-import os
-from dotenv import load_dotenv
 
+from google.api_core import exceptions as api_exceptions
 
-import google.generativeai as genai
-from google.generativeai import types
-from pathlib import Path
+from src.modules.sensitive_data_masker.assets import template_asset_store
+from src.utils.gemini_client import gemini_client
+from src.utils.payload import payload_optimizer
+from src.utils.verdict_cache import build_cache_key, verdict_cache
 
-load_dotenv()
-gemini_api_key = os.getenv("GEMINI_API_KEY")
 
-genai.configure(api_key=gemini_api_key)
-gemini_client = genai.GenerativeModel(
-    model_name="gemini-2.5-flash",
-    generation_config=types.GenerationConfig(
-        response_mime_type="application/json",
-    ),
+EXPIRED_ASSET_ERRORS = (
+    api_exceptions.NotFound,
+    api_exceptions.PermissionDenied,
+    api_exceptions.FailedPrecondition,
+    api_exceptions.InvalidArgument,
 )
 
 
-def compare_with_gemini(template_path, input_path, bank_name, template_name):
+async def compare_with_gemini(
+    template_path, input_path, bank_name, template_name, asset_store=None
+):
+    """
+    The template reference is sent through asset_store (default: uploaded
+    once per run), and inline when Gemini rejects its handle
+
+    Returns:
+        dict: {'is_match': bool, 'confidence': float, 'reason': str}
+    """
+    asset_store = asset_store or template_asset_store
     try:
         prompt = f"""Você é um especialista em análise de documentos bancários.
 
@@ -49,27 +57,37 @@ Seja rigoroso: apenas retorne is_match=true se tiver alta confiança (>85%)."""
         with open(input_path, "rb") as f:
             input_data = f.read()
 
-        template_ext = Path(template_path).suffix.lower()
-        input_ext = Path(input_path).suffix.lower()
-
-        mime_map = {
-            ".jpg": "image/jpeg",
-            ".jpeg": "image/jpeg",
-            ".png": "image/png",
-            ".pdf": "application/pdf",
-        }
-
-        template_mime = mime_map.get(template_ext, "image/jpeg")
-        input_mime = mime_map.get(input_ext, "image/jpeg")
-
-        contents = [
+        cache_key = build_cache_key(
+            "compare",
+            gemini_client.model_name,
             prompt,
-            {"mime_type": template_mime, "data": template_data},
-            {"mime_type": input_mime, "data": input_data},
-        ]
-
-        response = gemini_client.generate_content(contents=contents)
+            template_data,
+            input_data,
+            payload_optimizer.signature,
+        )
+        cached = await asyncio.to_thread(verdict_cache.get, cache_key)
+        if cached is not None:
+            return cached
+
+        template_parts, input_payload = await asyncio.gather(
+            asyncio.to_thread(asset_store.get_parts, template_path, template_data),
+            asyncio.to_thread(payload_optimizer.get_payload, input_path, input_data),
+        )
+
+        try:
+            response = await gemini_client.generate_content(
+                [prompt, *template_parts, *input_payload["parts"]]
+            )
+        except EXPIRED_ASSET_ERRORS:
+            asset_store.invalidate(template_path, template_data)
+            template_payload = await asyncio.to_thread(
+                payload_optimizer.get_payload, template_path, template_data
+            )
+            response = await gemini_client.generate_content(
+                [prompt, *template_payload["parts"], *input_payload["parts"]]
+            )
         result = json.loads(response.text)
+        await asyncio.to_thread(verdict_cache.set, cache_key, result)
         return result
 
     except Exception as e:
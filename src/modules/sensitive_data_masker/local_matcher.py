@@ -0,0 +1,199 @@
+import cv2
+import numpy as np
+
+THUMBNAIL_SIZE = (96, 192)
+SSIM_WINDOW = (7, 7)
+SSIM_SIGMA = 1.5
+SSIM_C1 = (0.01 * 255) ** 2
+SSIM_C2 = (0.03 * 255) ** 2
+# Largest offset (x, y) in thumbnail pixels between the input and a
+# reference that is compensated, about 5% of the width and 15% of the
+# height: a taller status bar or a different crop of the same screen
+MAX_SHIFT = (5, 30)
+
+
+def compute_thumbnail(image):
+    """
+    Downscaled grayscale of a receipt with its local mean and variance, the
+    parts of the SSIM that only depend on one of the two images
+
+    Returns:
+        dict: {'pixels', 'mean', 'variance'} float32 arrays of THUMBNAIL_SIZE
+        and 'aspect_ratio'
+    """
+    gray = image if image.ndim == 2 else cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+    height, width = gray.shape[:2]
+    pixels = cv2.resize(gray, THUMBNAIL_SIZE, interpolation=cv2.INTER_AREA)
+    return thumbnail_from_pixels(pixels, width / height)
+
+
+def thumbnail_from_pixels(pixels, aspect_ratio):
+    """
+    Thumbnail statistics from its uint8 pixels, which is all the feature
+    index stores
+    """
+    pixels = pixels.astype(np.float32)
+    mean = cv2.GaussianBlur(pixels, SSIM_WINDOW, SSIM_SIGMA)
+    variance = cv2.GaussianBlur(pixels * pixels, SSIM_WINDOW, SSIM_SIGMA) - mean * mean
+    return {
+        "pixels": pixels,
+        "mean": mean,
+        "variance": variance,
+        "aspect_ratio": aspect_ratio,
+    }
+
+
+def compute_template_thumbnail(image, boxes, reference_size):
+    """
+    Thumbnail of a template reference. reference_size is the (width,
+    height) the boxes were drawn at. The masked rectangles are left out of
+    the comparison through 'valid', since the black bars replace whatever
+    the input shows
+    """
+    thumbnail = compute_thumbnail(image)
+
+    valid = np.ones(thumbnail["pixels"].shape, dtype=bool)
+    if len(boxes):
+        scale = np.array(
+            [
+                THUMBNAIL_SIZE[0] / reference_size[0],
+                THUMBNAIL_SIZE[1] / reference_size[1],
+            ]
+        )
+        starts = np.floor(boxes[:, :2] * scale).astype(np.int64) - 1
+        ends = np.ceil((boxes[:, :2] + boxes[:, 2:]) * scale).astype(np.int64) + 1
+        for (x0, y0), (x1, y1) in zip(np.maximum(starts, 0), ends):
+            valid[y0:y1, x0:x1] = False
+    thumbnail["valid"] = valid
+    return thumbnail
+
+
+def score_templates(input_thumbnail, templates):
+    """
+    Mean SSIM between the input and every template over the unmasked area of
+    each reference, times the aspect ratio factor, computed for all
+    templates at once: the references are stacked as channels so each
+    filter runs once in OpenCV, which releases the GIL. SSIM drops within a
+    pixel of offset, so the input is also scored moved by the offset to each
+    reference estimated by phase correlation, and the best score is kept
+
+    Returns:
+        np.ndarray: one confidence in [0, 1] per template
+    """
+    references = [template["thumbnail"] for template in templates]
+    similarity = score_references(input_thumbnail, references)
+
+    for index, reference in enumerate(references):
+        shifted = shift_thumbnail(input_thumbnail, reference)
+        if shifted is not None:
+            similarity[index] = max(
+                similarity[index],
+                score_references(shifted, [reference], shifted["overlap"])[0],
+            )
+
+    aspect_ratios = np.array([reference["aspect_ratio"] for reference in references])
+    input_ratio = input_thumbnail["aspect_ratio"]
+    aspect_factor = np.minimum(aspect_ratios, input_ratio) / np.maximum(
+        aspect_ratios, input_ratio
+    )
+
+    return np.clip(similarity, 0.0, 1.0) * aspect_factor
+
+
+def score_references(input_thumbnail, references, overlap=None):
+    """
+    Returns:
+        np.ndarray: mean SSIM of the input against every reference over
+        their valid pixels (and overlap, a bool array of the thumbnail size)
+    """
+    y = np.dstack([reference["pixels"] for reference in references])
+    mean_y = np.dstack([reference["mean"] for reference in references])
+    variance_y = np.dstack([reference["variance"] for reference in references])
+    valid = np.dstack([reference["valid"] for reference in references])
+    if overlap is not None:
+        valid = valid & overlap[:, :, None]
+
+    x = input_thumbnail["pixels"][:, :, None]
+    mean_x = input_thumbnail["mean"][:, :, None]
+    variance_x = input_thumbnail["variance"][:, :, None]
+
+    covariance = cv2.GaussianBlur(x * y, SSIM_WINDOW, SSIM_SIGMA).reshape(y.shape) - (
+        mean_x * mean_y
+    )
+    ssim = ((2 * mean_x * mean_y + SSIM_C1) * (2 * covariance + SSIM_C2)) / (
+        (mean_x * mean_x + mean_y * mean_y + SSIM_C1)
+        * (variance_x + variance_y + SSIM_C2)
+    )
+
+    valid_pixels = valid.sum(axis=(0, 1))
+    return np.where(
+        valid_pixels > 0,
+        (ssim * valid).sum(axis=(0, 1)) / np.maximum(valid_pixels, 1),
+        0.0,
+    )
+
+
+def shift_thumbnail(input_thumbnail, reference):
+    """
+    Input thumbnail resampled so its content lines up with the reference,
+    with the offset estimated by phase correlation. 'overlap' marks the
+    pixels that came from inside the input, away from the SSIM window of
+    the replicated border
+
+    Returns:
+        dict | None: thumbnail with 'overlap', None when the offset is below
+        half a pixel or above MAX_SHIFT
+    """
+    (shift_x, shift_y), _ = cv2.phaseCorrelate(
+        reference["pixels"], input_thumbnail["pixels"]
+    )
+    if max(abs(shift_x), abs(shift_y)) < 0.5:
+        return None
+    if abs(shift_x) > MAX_SHIFT[0] or abs(shift_y) > MAX_SHIFT[1]:
+        return None
+
+    height, width = input_thumbnail["pixels"].shape
+    pixels = cv2.warpAffine(
+        input_thumbnail["pixels"],
+        np.float32([[1, 0, shift_x], [0, 1, shift_y]]),
+        (width, height),
+        flags=cv2.INTER_LINEAR | cv2.WARP_INVERSE_MAP,
+        borderMode=cv2.BORDER_REPLICATE,
+    )
+    shifted = thumbnail_from_pixels(pixels, input_thumbnail["aspect_ratio"])
+
+    radius = SSIM_WINDOW[0] // 2
+    top = int(np.ceil(-shift_y)) + radius if shift_y < 0 else 0
+    bottom = height - int(np.ceil(shift_y)) - radius if shift_y > 0 else height
+    left = int(np.ceil(-shift_x)) + radius if shift_x < 0 else 0
+    right = width - int(np.ceil(shift_x)) - radius if shift_x > 0 else width
+    overlap = np.zeros((height, width), dtype=bool)
+    overlap[top:bottom, left:right] = True
+    shifted["overlap"] = overlap
+    return shifted
+
+
+def find_best_template_locally(image, templates, min_confidence=0.85):
+    """
+    Offline counterpart of find_best_template: the template with the highest
+    structural similarity, on the same 0-1 confidence scale and threshold
+
+    Returns:
+        dict | None: {'template', 'confidence', 'reason'}
+    """
+    if not templates:
+        return None
+
+    scores = score_templates(compute_thumbnail(image), templates)
+    ranking = np.argsort(scores)[::-1]
+    best_confidence = float(scores[ranking[0]])
+    next_confidence = float(scores[ranking[1]]) if len(ranking) > 1 else 0.0
+
+    if best_confidence < min_confidence:
+        return None
+
+    return {
+        "template": templates[ranking[0]],
+        "confidence": best_confidence,
+        "reason": f"local structural similarity (SSIM {best_confidence:.2f}, next {next_confidence:.2f})",
+    }
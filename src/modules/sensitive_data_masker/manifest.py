@@ -0,0 +1,93 @@
+import datetime
+import json
+import os
+
+from src.utils.verdict_cache import hash_bytes
+
+MANIFEST_FILENAME = "masking_manifest.jsonl"
+STATUS_MASKED = "masked"
+STATUS_NOT_MASKED = "not_masked"
+
+
+def hash_file(file_path):
+    with open(file_path, "rb") as f:
+        return hash_bytes(f.read())
+
+
+def get_template_label(template):
+    return f"{template['bank_name']}/{template['name']}.{template['file_extension']}"
+
+
+class RunManifest:
+    """
+    Append-only JSONL record of the files masked into an output directory,
+    one line per processed file: input path (relative to the input folder),
+    input hash, template (and the hash of its reference and coordinates),
+    masking options, output path and status. A file is done when its last
+    record is masked, neither its hash, its template nor the options
+    changed and the output is still there, so an interrupted run resumes
+    with the remaining files only. Lines cut by a crash are ignored
+    """
+
+    def __init__(self, output_dir, resume=True, options_key=None):
+        self.path = os.path.join(output_dir, MANIFEST_FILENAME)
+        self.options_key = options_key
+        self.records = {}
+        if resume:
+            self._load()
+
+    def _load(self):
+        if not os.path.exists(self.path):
+            return
+
+        with open(self.path, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                    self.records[record["input_path"]] = record
+                except (json.JSONDecodeError, KeyError, TypeError):
+                    continue
+
+    def get_done(self, input_path, input_hash, template_keys):
+        """
+        template_keys are the current keys of the templates of the file's
+        bank, by template label
+
+        Returns:
+            dict | None: the last record of input_path when it was already
+            masked from the same content, with the same options and an
+            unchanged template, and its output still exists
+        """
+        record = self.records.get(input_path)
+        if (
+            record
+            and record["status"] == STATUS_MASKED
+            and record["input_hash"] == input_hash
+            and record.get("options_key") == self.options_key
+            and record.get("template_key") is not None
+            and template_keys.get(record["template"]) == record["template_key"]
+            and os.path.exists(record["output_path"])
+        ):
+            return record
+        return None
+
+    def record(self, input_path, input_hash, output_path, result):
+        template = result["template"] if result else None
+        record = {
+            "input_path": input_path,
+            "input_hash": input_hash,
+            "template": get_template_label(template) if template else None,
+            "template_key": template.get("template_key") if template else None,
+            "options_key": self.options_key,
+            "output_path": output_path,
+            "status": STATUS_MASKED if result else STATUS_NOT_MASKED,
+            "confidence": result["confidence"] if result else None,
+            "verified": result["verified"] if result else False,
+            "timestamp": datetime.datetime.now().isoformat(timespec="seconds"),
+        }
+        self.records[input_path] = record
+
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        with open(self.path, "a", encoding="utf-8") as f:
+            f.write(json.dumps(record, ensure_ascii=False) + "\n")
+        return record
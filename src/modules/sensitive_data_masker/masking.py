@@ -1,56 +1,181 @@
 import os
-from PIL import Image, ImageDraw
+
+import cv2
 import fitz
+import numpy as np
+
+from src.utils.fitz_lock import fitz_lock
+
+DEFAULT_PNG_COMPRESSION = 3
+DEFAULT_JPEG_QUALITY = 90
 
 
-def apply_mask_to_image(image_path, coordinates, output_path):
+def apply_mask_to_image(
+    image,
+    boxes,
+    output_path,
+    png_compression=DEFAULT_PNG_COMPRESSION,
+    jpeg_quality=DEFAULT_JPEG_QUALITY,
+):
+    """
+    Mask the already decoded image in place and encode it once. boxes is an
+    (N, 4) array of x, y, width, height rows, shared read-only by every file
+    of a batch. Rectangles are clipped to the image bounds all at once and
+    each one is zeroed with a single slice assignment (end pixel included,
+    as ImageDraw did)
+    """
     try:
-        img = Image.open(image_path)
-        draw = ImageDraw.Draw(img)
+        if len(boxes):
+            height, width = image.shape[:2]
+            x0 = np.clip(boxes[:, 0], 0, width)
+            y0 = np.clip(boxes[:, 1], 0, height)
+            x1 = np.clip(boxes[:, 0] + boxes[:, 2] + 1, 0, width)
+            y1 = np.clip(boxes[:, 1] + boxes[:, 3] + 1, 0, height)
 
-        for coord in coordinates:
-            x = coord["x"]
-            y = coord["y"]
-            width = coord["width"]
-            height = coord["height"]
+            for left, top, right, bottom in zip(x0, y0, x1, y1):
+                image[top:bottom, left:right] = 0
 
-            draw.rectangle([x, y, x + width, y + height], fill="black")
+        ext = os.path.splitext(output_path)[1].lower()
+        if ext in [".jpg", ".jpeg"]:
+            params = [cv2.IMWRITE_JPEG_QUALITY, jpeg_quality]
+        else:
+            params = [cv2.IMWRITE_PNG_COMPRESSION, png_compression]
+
+        encoded, buffer = cv2.imencode(ext, image, params)
+        if not encoded:
+            raise ValueError(f"could not encode {ext}")
 
         os.makedirs(os.path.dirname(output_path), exist_ok=True)
-        img.save(output_path)
+        with open(output_path, "wb") as f:
+            f.write(buffer.tobytes())
 
         return True
 
     except Exception as e:
-        print(f"❌ Error masking image {image_path}: {e}")
+        print(f"❌ Error masking image {output_path}: {e}")
         return False
 
 
-def apply_mask_to_pdf(pdf_path, coordinates, output_path):
+def apply_mask_to_pdf(
+    document, pages_boxes, output_path, page_executor=None, redact=True
+):
+    """
+    Mask every page of an already open InputDocument. pages_boxes maps page
+    index to an (N, 4) box array in template pixels (page rendered at
+    PDF_RENDER_ZOOM); they are converted to PDF points with the page size,
+    so no page is rasterized here. With redact, the text and image pixels
+    under each rectangle are removed instead of only covered. Pages of
+    multi-page PDFs are masked in page_executor (a process pool) when one is
+    given; single-page PDFs are masked in place on the open document, so
+    they are not parsed again in a worker
+
+    Returns:
+        dict: {'masked': bool, 'leaked_chars': int | None} with the number
+        of characters still extractable inside the masked rectangles
+    """
     try:
-        doc = fitz.open(pdf_path)
-        page = doc[0]
+        pages_rects = {}
+        with fitz_lock:
+            for page_index, boxes in pages_boxes.items():
+                page = document.doc[page_index]
+                width, height = document.page_size(page_index)
+                pages_rects[page_index] = to_pdf_rects(boxes, page.rect, width, height)
 
-        page_rect = page.rect
-        pix = page.get_pixmap(matrix=fitz.Matrix(2, 2))
+        leaked_chars = 0
+        use_executor = page_executor is not None and len(pages_rects) > 1
+        if use_executor:
+            futures = {
+                page_index: page_executor.submit(
+                    mask_pdf_page, document.file_path, page_index, rects, redact
+                )
+                for page_index, rects in pages_rects.items()
+            }
+            masked_pages = {
+                page_index: future.result() for page_index, future in futures.items()
+            }
 
-        scale_x = page_rect.width / pix.width
-        scale_y = page_rect.height / pix.height
+        os.makedirs(os.path.dirname(output_path), exist_ok=True)
+        with fitz_lock:
+            if not use_executor:
+                for page_index, rects in pages_rects.items():
+                    page = document.doc[page_index]
+                    mask_page(page, rects, redact)
+                    leaked_chars += count_chars_in_rects(page, rects)
+                output_doc = document.doc
+            else:
+                output_doc = fitz.open()
+                for page_index in range(document.page_count):
+                    if page_index in masked_pages:
+                        page_bytes, page_leaked_chars = masked_pages[page_index]
+                        leaked_chars += page_leaked_chars
+                        with fitz.open("pdf", page_bytes) as page_doc:
+                            output_doc.insert_pdf(page_doc)
+                    else:
+                        output_doc.insert_pdf(
+                            document.doc, from_page=page_index, to_page=page_index
+                        )
 
-        for coord in coordinates:
-            pdf_x = coord["x"] * scale_x
-            pdf_y = coord["y"] * scale_y
-            pdf_width = coord["width"] * scale_x
-            pdf_height = coord["height"] * scale_y
+            output_doc.save(output_path, garbage=3, deflate=True)
+            if output_doc is not document.doc:
+                output_doc.close()
 
-            rect = fitz.Rect(pdf_x, pdf_y, pdf_x + pdf_width, pdf_y + pdf_height)
-            page.draw_rect(rect, color=(0, 0, 0), fill=(0, 0, 0))
+        return {"masked": True, "leaked_chars": leaked_chars}
+    except Exception as e:
+        print(f"❌ Error masking PDF {document.file_path}: {e}")
+        return {"masked": False, "leaked_chars": None}
 
-        os.makedirs(os.path.dirname(output_path), exist_ok=True)
-        doc.save(output_path)
-        doc.close()
 
-        return True
-    except Exception as e:
-        print(f"❌ Error masking PDF {pdf_path}: {e}")
-        return False
+def to_pdf_rects(boxes, page_rect, width, height):
+    scale_x = page_rect.width / width
+    scale_y = page_rect.height / height
+
+    points = np.asarray(boxes, dtype=np.float64) * [scale_x, scale_y, scale_x, scale_y]
+    points[:, 2:] += points[:, :2]
+    return [tuple(rect) for rect in points.tolist()]
+
+
+def mask_page(page, rects, redact=True):
+    if not redact:
+        for rect in rects:
+            page.draw_rect(fitz.Rect(rect), color=(0, 0, 0), fill=(0, 0, 0))
+        return
+
+    for rect in rects:
+        page.add_redact_annot(fitz.Rect(rect), fill=(0, 0, 0))
+    page.apply_redactions(images=fitz.PDF_REDACT_IMAGE_PIXELS)
+
+
+def count_chars_in_rects(page, rects):
+    """
+    Local verification: number of non-blank characters of the text layer
+    still inside a masked rectangle. A character counts when its center is
+    inside, since character boxes span the whole line height and neighbour
+    lines often touch the rectangle borders
+    """
+    areas = [fitz.Rect(rect) for rect in rects]
+    leaked_chars = 0
+    for block in page.get_text("rawdict")["blocks"]:
+        for line in block.get("lines", []):
+            for span in line["spans"]:
+                for char in span["chars"]:
+                    if char["c"].isspace():
+                        continue
+                    bbox = fitz.Rect(char["bbox"])
+                    center = fitz.Point(
+                        (bbox.x0 + bbox.x1) / 2, (bbox.y0 + bbox.y1) / 2
+                    )
+                    if any(area.contains(center) for area in areas):
+                        leaked_chars += 1
+    return leaked_chars
+
+
+def mask_pdf_page(pdf_path, page_index, rects, redact=True):
+    """
+    Process pool worker: mask a single page and return it as a one-page PDF
+    together with its local verification
+    """
+    with fitz.open(pdf_path) as doc:
+        doc.select([page_index])
+        page = doc[0]
+        mask_page(page, rects, redact)
+        return doc.tobytes(garbage=3, deflate=True), count_chars_in_rects(page, rects)
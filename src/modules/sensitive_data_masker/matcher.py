@@ -1,97 +1,64 @@
+import asyncio
 import os
-import json
-import cv2
 
+from src.modules.sensitive_data_masker.fingerprint import prefilter_templates
 from src.modules.sensitive_data_masker.gemini import compare_with_gemini
+from src.modules.sensitive_data_masker.registry import template_registry
 
-IMAGE_EXTENSIONS = {".png", ".jpg", ".jpeg"}
-PDF_EXTENSION = ".pdf"
 
+async def compare_with_template(template, input_path, bank_name):
+    result = await compare_with_gemini(
+        template["reference_path"], input_path, bank_name, template["name"]
+    )
+    return template, result
 
-def find_best_template(input_path, bank_name, min_confidence=0.85):
-    _, file_ext = os.path.splitext(input_path)
-    templates = load_bank_templates(bank_name, file_ext)
+
+async def find_best_template(
+    input_path, bank_name, min_confidence=0.85, templates=None, input_fingerprint=None
+):
+    if templates is None:
+        _, file_ext = os.path.splitext(input_path)
+        templates = template_registry.get_templates(bank_name, file_ext)
 
     if not templates:
         return None
 
+    if input_fingerprint is not None:
+        templates, local_match = prefilter_templates(input_fingerprint, templates)
+        if local_match:
+            return local_match
+
     best_match = None
     best_confidence = 0.0
 
-    for template in templates:
-        result = compare_with_gemini(
-            template["reference_path"], input_path, bank_name, template["name"]
-        )
+    tasks = [
+        asyncio.create_task(compare_with_template(template, input_path, bank_name))
+        for template in templates
+    ]
 
-        confidence = result.get("confidence", 0.0)
-        is_match = result.get("is_match", False)
+    try:
+        for next_comparison in asyncio.as_completed(tasks):
+            template, result = await next_comparison
 
-        if is_match and confidence > best_confidence:
-            best_confidence = confidence
-            best_match = {
-                "template": template,
-                "confidence": confidence,
-                "reason": result.get("reason", ""),
-            }
-
-    if best_match and best_confidence >= min_confidence:
-        return best_match
-
-    return None
-
-
-def load_bank_templates(
-    bank_name, file_extension, coordinates_dir="src/config/coordinates"
-):
-    templates = []
-    bank_dir = os.path.join(coordinates_dir, bank_name)
+            confidence = result.get("confidence", 0.0)
+            is_match = result.get("is_match", False)
 
-    if not os.path.exists(bank_dir):
-        raise FileNotFoundError(
-            f"sensitive_data_masker: bank directory not found: {bank_dir} ⚠️"
-        )
-
-    is_pdf = file_extension.lower() == PDF_EXTENSION
-    valid_extensions = {PDF_EXTENSION} if is_pdf else IMAGE_EXTENSIONS
-
-    json_files = [f for f in os.listdir(bank_dir) if f.endswith(".json")]
-
-    for json_file in json_files:
-        base_name = json_file.replace(".json", "")
-        json_path = os.path.join(bank_dir, json_file)
+            if is_match and confidence > best_confidence:
+                best_confidence = confidence
+                best_match = {
+                    "template": template,
+                    "confidence": confidence,
+                    "reason": result.get("reason", ""),
+                }
 
-        ref_path = None
-        for ext in valid_extensions:
-            potential_ref = os.path.join(bank_dir, f"{base_name}{ext}")
-            if os.path.exists(potential_ref):
-                ref_path = potential_ref
+            if best_confidence >= min_confidence:
                 break
+    finally:
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
 
-        if not ref_path:
-            continue
-
-        try:
-            with open(json_path, "r", encoding="utf-8") as f:
-                coordinates = json.load(f)
-
-            if ref_path.lower().endswith(".pdf"):
-                reference_image = None
-            else:
-                reference_image = cv2.imread(ref_path)
-                if reference_image is None:
-                    continue
+    if best_match and best_confidence >= min_confidence:
+        return best_match
 
-            templates.append(
-                {
-                    "name": base_name,
-                    "reference_path": ref_path,
-                    "coordinates": coordinates,
-                    "reference_image": reference_image,
-                    "bank_name": bank_name,
-                    "file_extension": file_extension,
-                }
-            )
-        except Exception as e:
-            print(f"sensitive_data_masker: ❌ error loading template {json_file}: {e}")
-            continue
-    return templates
+    return None
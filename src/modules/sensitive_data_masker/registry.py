@@ -0,0 +1,211 @@
+import json
+import os
+import threading
+
+import cv2
+import fitz
+import numpy as np
+
+from src.modules.sensitive_data_masker.coordinates import (
+    normalize_page_coordinates,
+    to_boxes,
+)
+from src.modules.sensitive_data_masker.feature_index import (
+    build_feature_key,
+    compute_template_features,
+    get_feature_index,
+    to_template_fields,
+)
+from src.utils.fitz_lock import fitz_lock
+
+COORDINATES_DIR = "src/config/coordinates"
+IMAGE_EXTENSIONS = {".png", ".jpg", ".jpeg"}
+PDF_EXTENSION = ".pdf"
+PDF_RENDER_ZOOM = 2
+
+
+def get_file_kind(file_extension):
+    return "pdf" if file_extension.lower() == PDF_EXTENSION else "image"
+
+
+def load_bank_templates(bank_name, file_extension, coordinates_dir=COORDINATES_DIR):
+    templates = []
+    bank_dir = os.path.join(coordinates_dir, bank_name)
+
+    if not os.path.exists(bank_dir):
+        raise FileNotFoundError(
+            f"sensitive_data_masker: bank directory not found: {bank_dir} ⚠️"
+        )
+
+    is_pdf = file_extension.lower() == PDF_EXTENSION
+    valid_extensions = {PDF_EXTENSION} if is_pdf else IMAGE_EXTENSIONS
+
+    json_files = [f for f in os.listdir(bank_dir) if f.endswith(".json")]
+    feature_index = get_feature_index(coordinates_dir)
+
+    for json_file in json_files:
+        base_name = json_file.replace(".json", "")
+        json_path = os.path.join(bank_dir, json_file)
+
+        ref_path = None
+        for ext in valid_extensions:
+            potential_ref = os.path.join(bank_dir, f"{base_name}{ext}")
+            if os.path.exists(potential_ref):
+                ref_path = potential_ref
+                break
+
+        if not ref_path:
+            continue
+
+        try:
+            with open(json_path, "rb") as f:
+                coordinates_bytes = f.read()
+            with open(ref_path, "rb") as f:
+                reference_bytes = f.read()
+            pages = normalize_page_coordinates(json.loads(coordinates_bytes))
+            coordinates = pages.get(0, [])
+
+            if ref_path.lower().endswith(".pdf"):
+                reference_image = None
+                page_sizes = get_pdf_page_sizes(ref_path)
+                reference_width, reference_height = page_sizes[0]
+            else:
+                reference_image = cv2.imdecode(
+                    np.frombuffer(reference_bytes, dtype=np.uint8), cv2.IMREAD_COLOR
+                )
+                if reference_image is None:
+                    continue
+                reference_height, reference_width = reference_image.shape[:2]
+                page_sizes = {0: (reference_width, reference_height)}
+
+            template_id = os.path.relpath(ref_path, coordinates_dir)
+            feature_key = build_feature_key(reference_bytes, coordinates_bytes)
+            features = feature_index.get(template_id, feature_key)
+            if features is None:
+                features = compute_template_features(
+                    reference_image
+                    if reference_image is not None
+                    else render_pdf_preview(ref_path),
+                    coordinates,
+                    (reference_width, reference_height),
+                    with_alignment=reference_image is not None,
+                )
+                feature_index.put(template_id, feature_key, features)
+
+            templates.append(
+                {
+                    "name": base_name,
+                    "reference_path": ref_path,
+                    "template_key": feature_key,
+                    "coordinates": coordinates,
+                    "pages": pages,
+                    "page_boxes": {
+                        page_index: to_boxes(coords)
+                        for page_index, coords in pages.items()
+                    },
+                    "page_sizes": page_sizes,
+                    "reference_image": reference_image,
+                    "reference_width": reference_width,
+                    "reference_height": reference_height,
+                    **to_template_fields(features),
+                    "bank_name": bank_name,
+                    "file_extension": os.path.splitext(ref_path)[1].lstrip("."),
+                }
+            )
+        except Exception as e:
+            print(f"sensitive_data_masker: ❌ error loading template {json_file}: {e}")
+            continue
+
+    try:
+        feature_index.save()
+    except Exception as e:
+        print(f"sensitive_data_masker: could not save feature index: {e} ⚠️")
+    return templates
+
+
+def get_pdf_page_sizes(pdf_path):
+    """
+    Size of every page rendered at PDF_RENDER_ZOOM, the resolution the
+    template coordinates were drawn at, computed without rasterizing them
+    """
+    with fitz_lock, fitz.open(pdf_path) as doc:
+        return {
+            page_index: get_page_render_size(page)
+            for page_index, page in enumerate(doc)
+        }
+
+
+def get_page_render_size(page):
+    rect = page.rect * fitz.Matrix(PDF_RENDER_ZOOM, PDF_RENDER_ZOOM)
+    return rect.irect.width, rect.irect.height
+
+
+def render_pdf_preview(pdf_path, zoom=1):
+    with fitz_lock, fitz.open(pdf_path) as doc:
+        pix = doc[0].get_pixmap(matrix=fitz.Matrix(zoom, zoom), colorspace=fitz.csGRAY)
+        return np.frombuffer(pix.samples, dtype=np.uint8).reshape(pix.height, pix.width)
+
+
+class TemplateRegistry:
+    """
+    Process-wide cache of the templates of each bank, indexed by
+    (bank, file kind). An entry is reloaded when the modification time of
+    its bank directory changes (template added, removed or replaced)
+    """
+
+    def __init__(self, coordinates_dir=COORDINATES_DIR):
+        self.coordinates_dir = coordinates_dir
+        self._entries = {}
+        self._lock = threading.Lock()
+
+    def get_templates(self, bank_name, file_extension):
+        bank_dir = os.path.join(self.coordinates_dir, bank_name)
+        if not os.path.exists(bank_dir):
+            raise FileNotFoundError(
+                f"sensitive_data_masker: bank directory not found: {bank_dir} ⚠️"
+            )
+
+        key = (bank_name, get_file_kind(file_extension))
+        mtime = os.stat(bank_dir).st_mtime_ns
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry and entry["mtime"] == mtime:
+                return entry["templates"]
+
+            templates = load_bank_templates(
+                bank_name, file_extension, self.coordinates_dir
+            )
+            self._entries[key] = {"mtime": mtime, "templates": templates}
+            return templates
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+template_registry = TemplateRegistry()
+
+
+def build_feature_index(coordinates_dir=COORDINATES_DIR, bank_names=None):
+    """
+    Load every template of the given banks (all of them by default) so the
+    feature index holds a fresh entry for each one
+
+    Returns:
+        int: number of templates in the index for those banks
+    """
+    if bank_names is None:
+        bank_names = [
+            name
+            for name in sorted(os.listdir(coordinates_dir))
+            if os.path.isdir(os.path.join(coordinates_dir, name))
+        ]
+
+    total = 0
+    for bank_name in bank_names:
+        for file_extension in (".png", PDF_EXTENSION):
+            total += len(
+                load_bank_templates(bank_name, file_extension, coordinates_dir)
+            )
+    return total
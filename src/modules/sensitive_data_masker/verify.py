@@ -0,0 +1,108 @@
+import os
+
+import cv2
+import fitz
+import numpy as np
+
+from src.modules.sensitive_data_masker.registry import PDF_EXTENSION, PDF_RENDER_ZOOM
+from src.utils.fitz_lock import fitz_lock
+
+BLACK_THRESHOLD = 48
+MIN_COVERAGE = 0.98
+
+
+def verify_mask_coverage(output_path, pages_boxes):
+    """
+    Reload the masked output and check that every expected rectangle is
+    black. PDF pages are rendered at PDF_RENDER_ZOOM, the resolution the
+    boxes are expressed in. A rectangle fully outside its page masks
+    nothing and fails the file, one partially outside is only counted
+
+    Returns:
+        dict: {'passed': bool, 'rects': int, 'uncovered_rects': int,
+        'out_of_bounds_rects': int, 'min_coverage': float}
+    """
+    metrics = {
+        "passed": True,
+        "rects": 0,
+        "uncovered_rects": 0,
+        "out_of_bounds_rects": 0,
+        "min_coverage": 1.0,
+    }
+
+    for gray, boxes in load_masked_pages(output_path, pages_boxes):
+        coverage, out_of_bounds, outside = measure_coverage(gray, boxes)
+        metrics["rects"] += len(boxes)
+        metrics["uncovered_rects"] += int(np.count_nonzero(coverage < MIN_COVERAGE))
+        metrics["out_of_bounds_rects"] += int(np.count_nonzero(out_of_bounds))
+        if len(coverage):
+            metrics["min_coverage"] = min(
+                metrics["min_coverage"], float(coverage.min())
+            )
+        if outside.any():
+            metrics["passed"] = False
+
+    if metrics["uncovered_rects"]:
+        metrics["passed"] = False
+    return metrics
+
+
+def measure_coverage(gray, boxes):
+    """
+    Fraction of dark pixels inside each (x, y, width, height) box, computed
+    for all boxes at once from the integral image of the dark pixels. Boxes
+    are end-inclusive, like the masks drawn by apply_mask_to_image
+
+    Returns:
+        tuple: (coverage, out_of_bounds, outside) arrays, one value per box.
+        Boxes fully outside the image have a coverage of 0
+    """
+    height, width = gray.shape[:2]
+    boxes = np.asarray(boxes, dtype=np.int64).reshape(-1, 4)
+
+    x0 = np.clip(boxes[:, 0], 0, width)
+    y0 = np.clip(boxes[:, 1], 0, height)
+    x1 = np.clip(boxes[:, 0] + boxes[:, 2] + 1, 0, width)
+    y1 = np.clip(boxes[:, 1] + boxes[:, 3] + 1, 0, height)
+
+    dark = (gray <= BLACK_THRESHOLD).astype(np.uint8)
+    integral = cv2.integral(dark)
+    dark_pixels = (
+        integral[y1, x1] - integral[y0, x1] - integral[y1, x0] + integral[y0, x0]
+    )
+    areas = (x1 - x0) * (y1 - y0)
+    coverage = np.divide(
+        dark_pixels, areas, out=np.zeros(len(boxes), dtype=np.float64), where=areas > 0
+    )
+
+    out_of_bounds = (
+        (boxes[:, 0] < 0)
+        | (boxes[:, 1] < 0)
+        | (boxes[:, 0] + boxes[:, 2] > width)
+        | (boxes[:, 1] + boxes[:, 3] > height)
+    )
+    outside = areas == 0
+    return coverage, out_of_bounds, outside
+
+
+def load_masked_pages(output_path, pages_boxes):
+    if os.path.splitext(output_path)[1].lower() != PDF_EXTENSION:
+        gray = cv2.imread(output_path, cv2.IMREAD_GRAYSCALE)
+        if gray is None:
+            raise ValueError(f"could not load masked output: {output_path}")
+        yield gray, pages_boxes.get(0, [])
+        return
+
+    pages = []
+    with fitz_lock, fitz.open(output_path) as doc:
+        for page_index, boxes in pages_boxes.items():
+            pix = doc[page_index].get_pixmap(
+                matrix=fitz.Matrix(PDF_RENDER_ZOOM, PDF_RENDER_ZOOM),
+                colorspace=fitz.csGRAY,
+            )
+            gray = np.frombuffer(pix.samples, dtype=np.uint8).reshape(
+                pix.height, pix.stride
+            )[:, : pix.width]
+            pages.append((gray, boxes))
+
+    yield from pages
@@ -0,0 +1,6 @@
+import threading
+
+# PyMuPDF is not thread-safe: every fitz call made from a thread (thread
+# pools, asyncio.to_thread) holds this lock. Reentrant, so helpers that
+# take it may call each other. Process pool workers have their own copy
+fitz_lock = threading.RLock()
@@ -0,0 +1,156 @@
+import asyncio
+import os
+import random
+import time
+
+from dotenv import load_dotenv
+import google.generativeai as genai
+from google.api_core import exceptions as api_exceptions
+from google.generativeai import types
+
+load_dotenv()
+
+RETRYABLE_STATUS_CODES = {429, 500, 502, 503, 504}
+ESTIMATED_TOKENS_PER_ATTACHMENT = 1300
+ESTIMATED_OUTPUT_TOKENS = 300
+BASE_BACKOFF_SECONDS = 1.0
+MAX_BACKOFF_SECONDS = 60.0
+
+
+class TokenBucket:
+    """
+    Refills `capacity` tokens every `period` seconds. acquire waits until
+    enough tokens are available; consume may leave the bucket in debt when
+    the real usage turns out higher than estimated
+    """
+
+    def __init__(self, capacity, period=60.0):
+        self.capacity = capacity
+        self.rate = capacity / period
+        self.tokens = capacity
+        self.updated_at = time.monotonic()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(
+            self.capacity, self.tokens + (now - self.updated_at) * self.rate
+        )
+        self.updated_at = now
+
+    async def acquire(self, amount=1):
+        amount = min(amount, self.capacity)
+        while True:
+            self._refill()
+            if self.tokens >= amount:
+                self.tokens -= amount
+                return
+            await asyncio.sleep((amount - self.tokens) / self.rate)
+
+    def consume(self, amount):
+        self._refill()
+        self.tokens -= amount
+
+
+def estimate_tokens(contents):
+    tokens = ESTIMATED_OUTPUT_TOKENS
+    for part in contents:
+        if isinstance(part, str):
+            tokens += len(part) // 4
+        else:
+            tokens += ESTIMATED_TOKENS_PER_ATTACHMENT
+    return tokens
+
+
+def is_retryable(error):
+    if isinstance(error, asyncio.TimeoutError):
+        return True
+    if isinstance(error, api_exceptions.GoogleAPICallError):
+        return error.code in RETRYABLE_STATUS_CODES
+    return False
+
+
+class GeminiClient:
+    """
+    Gemini client shared by every stage: requests and tokens per minute are
+    limited with token buckets, in-flight calls with a semaphore, and
+    429/5xx/timeouts are retried with exponential backoff and full jitter
+    """
+
+    def __init__(
+        self,
+        model_name,
+        requests_per_minute,
+        tokens_per_minute,
+        max_concurrency,
+        timeout_seconds,
+        max_retries,
+    ):
+        self.model_name = model_name
+        self.max_concurrency = max_concurrency
+        self.timeout_seconds = timeout_seconds
+        self.max_retries = max_retries
+        self.request_bucket = TokenBucket(requests_per_minute)
+        self.token_bucket = TokenBucket(tokens_per_minute)
+        self.model = genai.GenerativeModel(model_name=model_name)
+        self._semaphore = None
+        self._loop = None
+
+    def _get_semaphore(self):
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            self._loop = loop
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        return self._semaphore
+
+    async def generate_content(self, contents, response_mime_type="application/json"):
+        generation_config = types.GenerationConfig(
+            response_mime_type=response_mime_type
+        )
+        estimated_tokens = estimate_tokens(contents)
+
+        attempt = 0
+        while True:
+            await self.request_bucket.acquire()
+            await self.token_bucket.acquire(estimated_tokens)
+
+            try:
+                async with self._get_semaphore():
+                    response = await asyncio.wait_for(
+                        self.model.generate_content_async(
+                            contents=contents, generation_config=generation_config
+                        ),
+                        timeout=self.timeout_seconds,
+                    )
+            except Exception as e:
+                if not is_retryable(e) or attempt >= self.max_retries:
+                    raise
+
+                attempt += 1
+                backoff = min(
+                    MAX_BACKOFF_SECONDS, BASE_BACKOFF_SECONDS * 2 ** (attempt - 1)
+                )
+                delay = random.uniform(0, backoff)
+                print(
+                    f"gemini_client: ⚠️ {type(e).__name__}, retrying in {delay:.1f}s ({attempt}/{self.max_retries})"
+                )
+                await asyncio.sleep(delay)
+                continue
+
+            usage = getattr(response, "usage_metadata", None)
+            total_tokens = getattr(usage, "total_token_count", 0) if usage else 0
+            if total_tokens:
+                self.token_bucket.consume(total_tokens - estimated_tokens)
+
+            return response
+
+
+genai.configure(api_key=os.getenv("GEMINI_API_KEY"))
+
+gemini_client = GeminiClient(
+    model_name=os.getenv("GEMINI_MODEL", "gemini-2.5-flash"),
+    requests_per_minute=int(os.getenv("GEMINI_RPM", 1000)),
+    tokens_per_minute=int(os.getenv("GEMINI_TPM", 1000000)),
+    max_concurrency=int(os.getenv("GEMINI_MAX_CONCURRENCY", 16)),
+    timeout_seconds=float(os.getenv("GEMINI_TIMEOUT_SECONDS", 120)),
+    max_retries=int(os.getenv("GEMINI_MAX_RETRIES", 5)),
+)
@@ -10,4 +10,4 @@ def get_mime_type(input):
         return "image/jpeg"
     elif suffix == ".pdf":
         return "application/pdf"
-    raise None
+    return None
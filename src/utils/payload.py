@@ -0,0 +1,176 @@
+import os
+import threading
+from collections import OrderedDict
+
+import cv2
+import fitz
+import numpy as np
+from dotenv import load_dotenv
+
+from src.utils.fitz_lock import fitz_lock
+from src.utils.verdict_cache import hash_bytes
+
+load_dotenv()
+
+PAYLOAD_FORMATS = {
+    "webp": (".webp", "image/webp", cv2.IMWRITE_WEBP_QUALITY),
+    "jpeg": (".jpg", "image/jpeg", cv2.IMWRITE_JPEG_QUALITY),
+}
+ORIGINAL_FORMAT = "original"
+MIME_TYPES = {
+    ".jpg": "image/jpeg",
+    ".jpeg": "image/jpeg",
+    ".png": "image/png",
+    ".webp": "image/webp",
+    ".pdf": "application/pdf",
+}
+
+
+class PayloadOptimizer:
+    """
+    Size-capped representation of the files sent to Gemini: images are
+    downscaled to max_side on their long side and re-encoded as WebP/JPEG,
+    PDF pages are rasterized at pdf_dpi (one part per page). The original
+    bytes are kept when the re-encoded image would not be smaller. Results
+    are cached in memory by file hash (LRU), so a template reference or a
+    receipt seen by classify, compare and guardrails is only converted once
+    """
+
+    def __init__(
+        self,
+        image_format="webp",
+        max_side=2048,
+        quality=85,
+        pdf_dpi=150,
+        max_entries=256,
+    ):
+        if image_format != ORIGINAL_FORMAT and image_format not in PAYLOAD_FORMATS:
+            raise ValueError(f"unknown payload format: {image_format}")
+
+        self.image_format = image_format
+        self.max_side = max_side
+        self.quality = quality
+        self.pdf_dpi = pdf_dpi
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    @property
+    def signature(self):
+        """
+        Settings that change the uploaded bytes, part of the verdict cache keys
+        """
+        if self.image_format == ORIGINAL_FORMAT:
+            return ORIGINAL_FORMAT
+        return f"{self.image_format}:{self.max_side}:{self.quality}:{self.pdf_dpi}"
+
+    def get_payload(self, file_path, file_data=None, mime_type=None):
+        """
+        file_data are the bytes of file_path when the caller already read
+        them, mime_type the type to send them with when they are kept
+
+        Returns:
+            dict: {'parts': [{'mime_type', 'data'}], 'file_hash': str,
+            'original_bytes': int, 'payload_bytes': int}
+        """
+        if file_data is None:
+            with open(file_path, "rb") as f:
+                file_data = f.read()
+        file_hash = hash_bytes(file_data)
+
+        with self._lock:
+            payload = self._entries.get(file_hash)
+            if payload is not None:
+                self._entries.move_to_end(file_hash)
+                return payload
+
+        ext = os.path.splitext(file_path)[1].lower()
+        parts = self.convert(file_data, ext, mime_type)
+        payload = {
+            "parts": parts,
+            "file_hash": file_hash,
+            "original_bytes": len(file_data),
+            "payload_bytes": sum(len(part["data"]) for part in parts),
+        }
+
+        with self._lock:
+            self._entries[file_hash] = payload
+            self._entries.move_to_end(file_hash)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return payload
+
+    def convert(self, file_data, ext, mime_type=None):
+        original = [
+            {
+                "mime_type": mime_type or MIME_TYPES.get(ext, "image/jpeg"),
+                "data": file_data,
+            }
+        ]
+        if self.image_format == ORIGINAL_FORMAT:
+            return original
+
+        if ext == ".pdf":
+            return self.rasterize_pdf(file_data)
+
+        image = cv2.imdecode(np.frombuffer(file_data, dtype=np.uint8), cv2.IMREAD_COLOR)
+        if image is None:
+            return original
+
+        resized = self.resize(image)
+        data = self.encode(resized)
+        if resized is image and len(data) >= len(file_data):
+            return original
+        return [{"mime_type": PAYLOAD_FORMATS[self.image_format][1], "data": data}]
+
+    def rasterize_pdf(self, file_data):
+        zoom = self.pdf_dpi / 72
+        images = []
+        with fitz_lock, fitz.open("pdf", file_data) as doc:
+            for page in doc:
+                pix = page.get_pixmap(matrix=fitz.Matrix(zoom, zoom), alpha=False)
+                images.append(
+                    np.frombuffer(pix.samples, dtype=np.uint8).reshape(
+                        pix.height, pix.width, pix.n
+                    )
+                )
+
+        parts = []
+        for image in images:
+            image = cv2.cvtColor(image, cv2.COLOR_RGB2BGR)
+            parts.append(
+                {
+                    "mime_type": PAYLOAD_FORMATS[self.image_format][1],
+                    "data": self.encode(self.resize(image)),
+                }
+            )
+        return parts
+
+    def resize(self, image):
+        height, width = image.shape[:2]
+        long_side = max(height, width)
+        if long_side <= self.max_side:
+            return image
+
+        scale = self.max_side / long_side
+        return cv2.resize(
+            image,
+            (max(1, round(width * scale)), max(1, round(height * scale))),
+            interpolation=cv2.INTER_AREA,
+        )
+
+    def encode(self, image):
+        ext, _, quality_flag = PAYLOAD_FORMATS[self.image_format]
+        encoded, buffer = cv2.imencode(ext, image, [quality_flag, self.quality])
+        if not encoded:
+            raise ValueError(f"could not encode {ext}")
+        return buffer.tobytes()
+
+
+payload_optimizer = PayloadOptimizer(
+    image_format=os.getenv("GEMINI_PAYLOAD_FORMAT", "webp"),
+    max_side=int(os.getenv("GEMINI_PAYLOAD_MAX_SIDE", 2048)),
+    quality=int(os.getenv("GEMINI_PAYLOAD_QUALITY", 85)),
+    pdf_dpi=int(os.getenv("GEMINI_PAYLOAD_PDF_DPI", 150)),
+    max_entries=int(os.getenv("GEMINI_PAYLOAD_CACHE_ENTRIES", 256)),
+)
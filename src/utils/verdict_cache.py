@@ -0,0 +1,150 @@
+import atexit
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+DEFAULT_CACHE_PATH = "z_cache/gemini_verdicts.sqlite"
+DEFAULT_TTL_DAYS = 30
+DEFAULT_MAX_ENTRIES = 50000
+# Access times of cache hits are written with the next write, or once this
+# many are pending, so reads never commit
+ACCESS_FLUSH_ENTRIES = 256
+
+
+def hash_bytes(data):
+    return hashlib.sha256(data).hexdigest()
+
+
+def build_cache_key(*parts):
+    """
+    SHA-256 over every part (file hashes, prompt, model name, template
+    identity), so a change in any of them is a cache miss
+    """
+    digest = hashlib.sha256()
+    for part in parts:
+        if isinstance(part, str):
+            part = part.encode("utf-8")
+        digest.update(hashlib.sha256(part).digest())
+    return digest.hexdigest()
+
+
+class VerdictCache:
+    """
+    On-disk cache of Gemini verdicts shared between runs. Entries older than
+    the TTL are ignored and purged, and the least recently used ones are
+    evicted when the cache grows past max_entries. get and set block on
+    sqlite, so coroutines call them through asyncio.to_thread
+    """
+
+    def __init__(self, path, ttl_seconds, max_entries):
+        self.path = path
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._connection = None
+        self._accessed = {}
+
+    def _connect(self):
+        if self._connection is None:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            self._connection = sqlite3.connect(
+                self.path, timeout=30, check_same_thread=False
+            )
+            self._connection.execute(
+                """CREATE TABLE IF NOT EXISTS verdicts (
+                    key TEXT PRIMARY KEY,
+                    value TEXT NOT NULL,
+                    created_at REAL NOT NULL,
+                    accessed_at REAL NOT NULL
+                )"""
+            )
+            self._connection.commit()
+        return self._connection
+
+    def get(self, key):
+        try:
+            with self._lock:
+                connection = self._connect()
+                row = connection.execute(
+                    "SELECT value, created_at FROM verdicts WHERE key = ?", (key,)
+                ).fetchone()
+                if row is None:
+                    return None
+
+                value, created_at = row
+                now = time.time()
+                # expired entries are purged by the next write
+                if now - created_at > self.ttl_seconds:
+                    return None
+
+                self._accessed[key] = now
+                if len(self._accessed) >= ACCESS_FLUSH_ENTRIES:
+                    self._write_accessed(connection)
+                    connection.commit()
+                return json.loads(value)
+        except Exception as e:
+            print(f"verdict_cache: ⚠️ error reading cache: {e}")
+            return None
+
+    def set(self, key, value):
+        try:
+            with self._lock:
+                connection = self._connect()
+                now = time.time()
+                connection.execute(
+                    "INSERT OR REPLACE INTO verdicts (key, value, created_at, accessed_at) VALUES (?, ?, ?, ?)",
+                    (key, json.dumps(value, ensure_ascii=False), now, now),
+                )
+                self._write_accessed(connection)
+                self._evict(connection, now)
+                connection.commit()
+        except Exception as e:
+            print(f"verdict_cache: ⚠️ error writing cache: {e}")
+
+    def flush(self):
+        """
+        Writes the pending access times, at the end of the process
+        """
+        try:
+            with self._lock:
+                if self._accessed:
+                    connection = self._connect()
+                    self._write_accessed(connection)
+                    connection.commit()
+        except Exception as e:
+            print(f"verdict_cache: ⚠️ error writing cache: {e}")
+
+    def _write_accessed(self, connection):
+        connection.executemany(
+            "UPDATE verdicts SET accessed_at = ? WHERE key = ?",
+            [(accessed_at, key) for key, accessed_at in self._accessed.items()],
+        )
+        self._accessed = {}
+
+    def _evict(self, connection, now):
+        connection.execute(
+            "DELETE FROM verdicts WHERE created_at < ?", (now - self.ttl_seconds,)
+        )
+        (count,) = connection.execute("SELECT COUNT(*) FROM verdicts").fetchone()
+        if count > self.max_entries:
+            connection.execute(
+                "DELETE FROM verdicts WHERE key IN (SELECT key FROM verdicts ORDER BY accessed_at ASC LIMIT ?)",
+                (count - self.max_entries,),
+            )
+
+
+verdict_cache = VerdictCache(
+    path=os.getenv("GEMINI_CACHE_PATH", DEFAULT_CACHE_PATH),
+    ttl_seconds=float(os.getenv("GEMINI_CACHE_TTL_DAYS", DEFAULT_TTL_DAYS)) * 86400,
+    max_entries=int(os.getenv("GEMINI_CACHE_MAX_ENTRIES", DEFAULT_MAX_ENTRIES)),
+)
+atexit.register(verdict_cache.flush)